@@ -0,0 +1,62 @@
+"""
+Cold-start time per `tns` subcommand.
+
+Each run is a fresh interpreter doing `tns <command> --help`, which
+imports everything the command needs before doing any work. Also
+reports whether `requests` was pulled in.
+
+    python benchmarks/cli_startup.py [RUNS]
+"""
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+
+COMMANDS = ["--help", "filter", "generate", "upload", "evaluate", "serve", "replay"]
+
+PROBE = """
+import sys
+from tns.cli import main
+try:
+    main(sys.argv[1:])
+except SystemExit:
+    pass
+sys.stderr.write("requests" if "requests" in sys.modules else "-")
+"""
+
+
+def time_run(argv, runs):
+    """Wall-clock seconds for each of `runs` fresh interpreters."""
+    timings = []
+    result = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *argv], cwd=ROOT, capture_output=True, text=True
+        )
+        timings.append(time.perf_counter() - start)
+    return timings, result
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+
+    timings, _ = time_run(["-c", "pass"], runs)
+    print(f"{'python -c pass':<16} median {statistics.median(timings) * 1000:6.1f} ms")
+
+    for command in COMMANDS:
+        argv = [command] if command == "--help" else [command, "--help"]
+        timings, result = time_run(["-c", PROBE, *argv], runs)
+        loaded = result.stderr.rstrip().endswith("requests")
+        label = "tns" if command == "--help" else f"tns {command}"
+        print(
+            f"{label:<16} median {statistics.median(timings) * 1000:6.1f} ms"
+            f"   min {min(timings) * 1000:6.1f} ms   requests imported: {loaded}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Bytes per patient: TnsStore vs. a defaultdict of datetimes.
+
+    python benchmarks/store_memory.py [NUM_PATIENTS]
+"""
+import sys
+import tracemalloc
+from collections import defaultdict
+from datetime import datetime
+
+from tns.fhir_time import from_epoch, to_epoch
+from tns.store import TnsStore
+
+
+def _measure(build):
+    tracemalloc.start()
+    obj = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return obj, current
+
+
+def benchmark(num_patients=1_000_000, obs_per_patient=3):
+    """
+    Compare bytes per patient for the old defaultdict-of-datetimes
+    layout against TnsStore. Patient ids are built fresh for each
+    observation, as json.loads would do.
+    """
+    base = to_epoch(datetime(2025, 1, 1))
+
+    def observations():
+        for i in range(num_patients):
+            for j in range(obs_per_patient):
+                yield f"{i:08d}-mimic-patient", base + i + j * 3600
+
+    def build_dict():
+        tns_times = defaultdict(lambda: None)
+        for pid, seconds in observations():
+            dt = from_epoch(seconds)
+            current = tns_times[pid]
+            if current is None or dt > current:
+                tns_times[pid] = dt
+        return tns_times
+
+    def build_store():
+        store = TnsStore()
+        for pid, seconds in observations():
+            store.update(pid, seconds)
+        return store
+
+    old, old_bytes = _measure(build_dict)
+    del old
+    store, new_bytes = _measure(build_store)
+
+    print(f"Patients: {num_patients:,} ({obs_per_patient} T&S observations each)")
+    print(f"defaultdict[str, datetime]: {old_bytes / num_patients:8.1f} bytes/patient")
+    print(f"TnsStore (array('q')):      {new_bytes / num_patients:8.1f} bytes/patient")
+    print(f"  TnsStore.nbytes():        {store.nbytes() / num_patients:8.1f} bytes/patient")
+
+
+if __name__ == "__main__":
+    benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else 1_000_000)
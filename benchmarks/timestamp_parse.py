@@ -0,0 +1,60 @@
+"""
+Per-timestamp cost of the fhir_time codec on distinct FHIR instants,
+against the evaluator's old parse_iso(), plus the evaluator's "latest
+T&S before surgery" loop written both ways.
+
+    python benchmarks/timestamp_parse.py [COUNT]
+"""
+import sys
+import timeit
+from datetime import datetime, timedelta
+
+from tns import fhir_time
+
+
+def parse_iso(dt_str):
+    return datetime.fromisoformat(dt_str.replace("Z", "+00:00"))
+
+
+def latest_before(parse, surgery_time, values):
+    """The evaluator's inner loop over one patient's Observations."""
+    latest = None
+    for value in values:
+        t = parse(value)
+        if t > surgery_time:
+            continue
+        if latest is None or t > latest:
+            latest = t
+    return latest
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 96_000
+    base = datetime(2025, 1, 1)
+    fixed = [fhir_time.format_fhir(base + timedelta(seconds=37 * i)) for i in range(count)]
+    offset = [s[:-1] + ".250+02:00" for s in fixed]
+
+    cases = [
+        ("parse_iso (old)", lambda: [parse_iso(v) for v in fixed]),
+        ("parse, fixed layout", lambda: [fhir_time.parse(v) for v in fixed]),
+        ("parse, offset + fraction", lambda: [fhir_time.parse(v) for v in offset]),
+        ("to_epoch, fixed layout", lambda: [fhir_time.to_epoch(v) for v in fixed]),
+        ("parse_many, fixed layout", lambda: fhir_time.parse_many(fixed)),
+    ]
+    for label, fn in cases:
+        seconds = min(timeit.repeat(fn, number=1, repeat=5))
+        print(f"{label:<32} {seconds / count * 1e6:6.3f} µs/timestamp")
+
+    surgery = fixed[count // 2]
+    loops = [
+        ("evaluator loop, parse_iso (old)", parse_iso),
+        ("evaluator loop, parse", fhir_time.parse),
+    ]
+    for label, parse in loops:
+        cutoff = parse(surgery)
+        seconds = min(timeit.repeat(lambda: latest_before(parse, cutoff, fixed), number=1, repeat=5))
+        print(f"{label:<32} {seconds / count * 1e6:6.3f} µs/Observation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+import threading
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+from tns import config
+from tns.serve import FhirStore, make_handler
+
+
+def surgery(sid, patient_id, when):
+    return {
+        "resourceType": "ServiceRequest",
+        "id": sid,
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "occurrenceDateTime": when,
+    }
+
+
+def type_and_screen(oid, patient_id, when):
+    return {
+        "resourceType": "Observation",
+        "id": oid,
+        "subject": {"reference": f"Patient/{patient_id}"},
+        "code": {"coding": [{"system": "http://loinc.org", "code": config.TNS_CODES[0]}]},
+        "effectiveDateTime": when,
+    }
+
+
+@pytest.fixture
+def fhir(monkeypatch):
+    """
+    An in-process FHIR stand-in on an ephemeral port. Tests append
+    predicates to server.fail_get / server.fail_post; a request whose
+    path matches any of them gets a 500.
+    """
+    store = FhirStore()
+    base = make_handler(store)
+
+    class FailingHandler(base):
+        def do_GET(self):
+            if any(match(self.path) for match in server.fail_get):
+                return self._send(500, {"resourceType": "OperationOutcome"})
+            return super().do_GET()
+
+        def do_POST(self):
+            if any(match(self.path) for match in server.fail_post):
+                return self._send(500, {"resourceType": "OperationOutcome"})
+            return super().do_POST()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FailingHandler)
+    server.store = store
+    server.fail_get = []
+    server.fail_post = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+
+    monkeypatch.setattr(config, "FHIR_BASE", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(config, "AUTH", "none")
+    yield server
+
+    server.shutdown()
+    server.server_close()
@@ -0,0 +1,95 @@
+import json
+import uuid
+from datetime import datetime, timezone
+
+import pytest
+
+from conftest import surgery, type_and_screen
+from tns import evaluate, fhir_time
+from tns.alert_diff import FLAG_ID_NAMESPACE, NO_LONGER_SCHEDULED
+
+# One more than a ServiceRequest page, so the fetch needs a second page
+SURGERIES = 201
+
+
+def read_lines(path):
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def test_fetch_error_leaves_state_untouched(fhir, tmp_path):
+    for n in range(SURGERIES):
+        fhir.store.put(surgery(f"sr-{n:03d}", f"p{n}", "2026-10-20T08:00:00Z"))
+    state = tmp_path / "state.ndjson"
+
+    evaluate.main(["--state", str(state), "--output", str(tmp_path / "first.ndjson")])
+    saved = state.read_text(encoding="utf-8")
+    assert len(read_lines(state)) == SURGERIES
+
+    fhir.fail_get.append(lambda path: path.startswith("/ServiceRequest") and "_offset" in path)
+    output = tmp_path / "second.ndjson"
+    with pytest.raises(SystemExit) as excinfo:
+        evaluate.main(["--state", str(state), "--output", str(output)])
+
+    assert excinfo.value.code == 1
+    assert state.read_text(encoding="utf-8") == saved
+    assert not [r for r in read_lines(output) if r["change"] == "resolved"]
+
+
+def test_failed_flag_batch_keeps_previous_state(fhir, tmp_path):
+    fhir.store.put(surgery("sr-a", "pa", "2026-10-20T08:00:00Z"))
+    state = tmp_path / "state.ndjson"
+    args = ["--state", str(state), "--output", str(tmp_path / "out.ndjson"), "--publish-flags"]
+
+    evaluate.main(args)
+    assert [r["surgery_id"] for r in read_lines(state)] == ["sr-a"]
+
+    # sr-a resolves and sr-c starts alerting, but the Flag write fails
+    fhir.store.put(type_and_screen("obs-a", "pa", "2026-10-19T08:00:00Z"))
+    fhir.store.put(surgery("sr-c", "pc", "2026-10-20T09:00:00Z"))
+    fhir.fail_post.append(lambda path: True)
+    with pytest.raises(SystemExit) as excinfo:
+        evaluate.main(args)
+    assert excinfo.value.code == 1
+    assert [r["surgery_id"] for r in read_lines(state)] == ["sr-a"]
+
+    # Once Flags can be written again, both changes are emitted
+    fhir.fail_post.clear()
+    evaluate.main(args)
+    changes = {r["surgery_id"]: r["change"] for r in read_lines(tmp_path / "out.ndjson")}
+    assert changes == {"sr-a": "resolved", "sr-c": "new"}
+    assert [r["surgery_id"] for r in read_lines(state)] == ["sr-c"]
+
+
+def test_flag_period_start_survives_updates_and_resolution(fhir, tmp_path, monkeypatch):
+    fhir.store.put(surgery("sr-a", "pa", "2026-10-20T08:00:00Z"))
+    state = tmp_path / "state.ndjson"
+    output = tmp_path / "out.ndjson"
+    args = ["--state", str(state), "--output", str(output), "--publish-flags"]
+    flag_id = str(uuid.uuid5(FLAG_ID_NAMESPACE, "sr-a"))
+
+    def run_at(hour):
+        monkeypatch.setattr(fhir_time, "utcnow", lambda: datetime(2026, 10, 19, hour, tzinfo=timezone.utc))
+        evaluate.main(args)
+        return fhir.store.get("Flag", flag_id)
+
+    flag = run_at(1)
+    assert flag["period"] == {"start": "2026-10-19T01:00:00Z"}
+
+    # Reason changes from "no T&S" to "too old": same alert, same start
+    fhir.store.put(type_and_screen("obs-a", "pa", "2026-10-01T08:00:00Z"))
+    flag = run_at(2)
+    assert flag["code"]["text"].startswith("Latest Type & Screen is older")
+    assert flag["period"] == {"start": "2026-10-19T01:00:00Z"}
+
+    # Surgery taken off the schedule
+    fhir.store._resources["ServiceRequest"].pop("sr-a")
+    flag = run_at(3)
+    assert flag["status"] == "inactive"
+    assert flag["period"] == {"start": "2026-10-19T01:00:00Z", "end": "2026-10-19T03:00:00Z"}
+
+    [record] = read_lines(output)
+    assert record["change"] == "resolved"
+    assert record["alert"] is False
+    assert record["reason"] == NO_LONGER_SCHEDULED
+    assert read_lines(state) == []
@@ -0,0 +1,79 @@
+import json
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from tns import config, fhir_time
+from tns.evaluate import build_result
+
+
+def test_z_offset_and_naive_agree():
+    utc = fhir_time.parse("2025-03-01T10:00:00Z")
+    assert fhir_time.parse("2025-03-01T12:00:00+02:00") == utc
+    assert fhir_time.parse("2025-03-01T10:00:00") == utc
+    assert fhir_time.parse("2025-03-01T10:00:00").tzinfo is not None
+    assert {fhir_time.to_epoch(v) for v in (
+        "2025-03-01T10:00:00Z", "2025-03-01T12:00:00+02:00", "2025-03-01T10:00:00",
+    )} == {fhir_time.to_epoch(utc)}
+
+
+def test_fraction_after_surgery_is_not_before_it():
+    surgery = fhir_time.parse("2025-03-01T10:00:00Z")
+    result = fhir_time.parse("2025-03-01T10:00:00.900Z")
+    assert result > surgery
+    assert fhir_time.parse("2025-03-01T09:59:59.999+00:00") < surgery
+
+
+def test_valid_window_boundary_keeps_fractions():
+    surgery = fhir_time.parse("2025-03-04T10:00:00Z")
+    window_start = surgery - timedelta(hours=config.TNS_VALID_HOURS)
+    just_inside = window_start
+    just_outside = window_start - timedelta(microseconds=500_000)
+
+    assert build_result({"id": "s"}, "p", surgery, just_inside)["alert"] is False
+    assert build_result({"id": "s"}, "p", surgery, just_outside)["alert"] is True
+
+
+def test_date_only_is_midnight_utc():
+    assert fhir_time.parse("2025-03-01") == datetime(2025, 3, 1, tzinfo=timezone.utc)
+    assert fhir_time.to_epoch("1970-01-02") == 86400
+
+
+@pytest.mark.parametrize("value", ["2025-01", "2025", "", "not a date"])
+def test_partial_or_bad_values_are_rejected(value):
+    with pytest.raises(ValueError):
+        fhir_time.parse(value)
+    with pytest.raises(ValueError):
+        fhir_time.to_epoch(value)
+
+
+def test_to_epoch_floors():
+    assert fhir_time.to_epoch("1970-01-01T00:00:01.999Z") == 1
+    assert fhir_time.to_epoch("1969-12-31T23:59:59.500Z") == -1
+    assert fhir_time.to_epoch("1969-12-31T23:59:59Z") == -1
+    assert fhir_time.to_epoch(datetime(1969, 12, 31, 23, 59, 58, 1)) == -2
+
+
+def test_parse_many_lines_up_with_input():
+    values = ["1970-01-01T00:00:10Z", "", None, "2025-01", "1970-01-01T01:00:00+01:00"]
+    assert list(fhir_time.parse_many(values)) == [
+        10, fhir_time.NO_EPOCH, fhir_time.NO_EPOCH, fhir_time.NO_EPOCH, 0,
+    ]
+
+
+def test_latest_tns_loader_skips_bad_times(tmp_path):
+    from tns.generate import load_latest_tns_per_patient
+
+    path = tmp_path / "tns.ndjson"
+    lines = [
+        {"resourceType": "Observation", "subject": {"reference": "Patient/a"}, "effectiveDateTime": "1970-01-01T00:01:00Z"},
+        {"resourceType": "Observation", "subject": {"reference": "Patient/a"}, "effectiveDateTime": "1970-01-01T00:02:00+01:00"},
+        {"resourceType": "Observation", "subject": {"reference": "Patient/b"}, "effectiveDateTime": "2025-01"},
+        {"resourceType": "Observation", "subject": {"reference": "Patient/c"}, "effectiveDateTime": "1970-01-01T00:00:30Z"},
+    ]
+    path.write_text("".join(json.dumps(line) + "\n" for line in lines), encoding="utf-8")
+
+    store = load_latest_tns_per_patient(path, batch_size=2)
+    assert store.latest_epoch("a") == 60
+    assert "b" not in store
+    assert store.latest_epoch("c") == 30
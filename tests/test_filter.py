@@ -0,0 +1,91 @@
+import json
+
+import pytest
+
+from tns import filter as tns_filter
+from tns.filter import SeenSet, dedup_key
+
+
+def observation(rid="obs-1", version=None, value="A", last_updated="2025-01-01T00:00:00Z"):
+    obs = {
+        "resourceType": "Observation",
+        "id": rid,
+        "meta": {"lastUpdated": last_updated},
+        "code": {"coding": [{"system": "http://loinc.org", "code": "883-9"}]},
+        "valueString": value,
+    }
+    if version:
+        obs["meta"]["versionId"] = version
+    return obs
+
+
+def test_dedup_key_uses_version_id_when_present():
+    assert dedup_key(observation(version="1")) == dedup_key(observation(version="1", value="B"))
+    assert dedup_key(observation(version="1")) != dedup_key(observation(version="2"))
+    assert dedup_key(observation("obs-1", "1")) != dedup_key(observation("obs-2", "1"))
+
+
+def test_dedup_key_hashes_content_without_version_id():
+    assert dedup_key(observation(value="A")) != dedup_key(observation(value="B"))
+    # lastUpdated changes between exports of the same resource
+    assert dedup_key(observation(last_updated="2025-01-01T00:00:00Z")) == \
+        dedup_key(observation(last_updated="2025-06-01T00:00:00Z"))
+
+
+def test_bloom_false_positive_still_admits_new_keys(tmp_path):
+    # A one-record filter is saturated almost at once, so nearly every
+    # lookup goes to the on-disk set
+    seen = SeenSet(tmp_path / "seen.sqlite", expected_records=1)
+    keys = [dedup_key(observation(f"obs-{n}")) for n in range(200)]
+
+    assert all(seen.add(key) for key in keys)
+    assert all(seen._maybe_seen(key) for key in keys)
+    assert not any(seen.add(key) for key in keys)
+    seen.close()
+
+
+def test_committed_keys_persist_across_runs(tmp_path):
+    db_path = tmp_path / "seen.sqlite"
+    seen = SeenSet(db_path)
+    assert seen.add(dedup_key(observation()))
+    seen.commit()
+    seen.close()
+
+    seen = SeenSet(db_path)
+    assert not seen.add(dedup_key(observation()))
+    assert seen.add(dedup_key(observation("obs-2")))
+    seen.close()
+
+
+def test_keys_roll_back_without_commit(tmp_path):
+    db_path = tmp_path / "seen.sqlite"
+    seen = SeenSet(db_path)
+    seen.add(dedup_key(observation()))
+    seen.spill()
+    seen.close()
+
+    seen = SeenSet(db_path)
+    assert seen.add(dedup_key(observation()))
+    seen.close()
+
+
+def test_seen_db_run_refuses_to_replace_unconsumed_output(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    export = tmp_path / "export.ndjson"
+    export.write_text(json.dumps(observation()) + "\n", encoding="utf-8")
+    args = [str(export), "--seen-db", str(tmp_path / "seen.sqlite")]
+
+    tns_filter.main(args)
+    output = tmp_path / tns_filter.OUTPUT_FILE
+    first = output.read_text(encoding="utf-8")
+    assert first.count("\n") == 1
+
+    with pytest.raises(SystemExit) as excinfo:
+        tns_filter.main(args)
+    assert excinfo.value.code == 1
+    assert output.read_text(encoding="utf-8") == first
+
+    # Once the output has been consumed, the next run only adds new records
+    output.rename(tmp_path / "uploaded.ndjson")
+    tns_filter.main(args)
+    assert output.read_text(encoding="utf-8") == ""
@@ -0,0 +1,79 @@
+import json
+
+from conftest import surgery, type_and_screen
+from tns import config, fhir_time
+from tns.replay import GroundTruth, load_events, percentile, run_replay, summarize
+
+NO_TNS = "No Type & Screen on file before surgery."
+UP_TO_DATE = "Type & Screen is up to date."
+
+
+def scheduled(sid, patient_id, authored, when):
+    sr = surgery(sid, patient_id, when)
+    sr["authoredOn"] = authored
+    return sr
+
+
+def test_percentile_is_nearest_rank():
+    values = list(range(1, 11))
+    assert percentile(values, 50) == 5
+    assert percentile(values, 99) == 10
+    assert percentile(values, 1) == 1
+    assert percentile([], 50) is None
+
+
+def test_ground_truth_tracks_each_state_change():
+    truth = GroundTruth()
+    sr = scheduled("sr-1", "p1", "2026-10-19T00:00:00Z", "2026-10-20T08:00:00Z")
+
+    assert truth.apply(sr) == [("sr-1", (True, NO_TNS, None))]
+    # Another patient's result changes nothing for sr-1
+    assert truth.apply(type_and_screen("obs-0", "p2", "2026-10-19T01:00:00Z")) == []
+    assert truth.apply(type_and_screen("obs-1", "p1", "2026-10-19T01:00:00Z")) == [
+        ("sr-1", (False, UP_TO_DATE, "2026-10-19T01:00:00Z")),
+    ]
+    # A result after incision does not count, so nothing changes
+    assert truth.apply(type_and_screen("obs-2", "p1", "2026-10-21T00:00:00Z")) == []
+
+
+def test_summarize_classifies_changes():
+    base = {"surgery_time": 100_000.0, "superseded": False}
+    changes = [
+        dict(base, applied=1.0, detected=1.5, detected_schedule_time=90_000.0),
+        dict(base, applied=2.0, detected=4.0, detected_schedule_time=101_000.0),
+        dict(base, applied=3.0, detected=None, superseded=True),
+        dict(base, applied=5.0, detected=None),
+    ]
+    summary = summarize(changes, speed=3600)
+
+    assert (summary["changes"], summary["detected"], summary["superseded"], summary["missed"]) == (4, 2, 1, 1)
+    assert summary["latency_p50"] == 0.5
+    assert summary["latency_max"] == 2.0
+    assert summary["late_alerts"] == 1
+    assert summary["min_lead_hours"] == -1000 / 3600
+
+
+def test_replay_detects_a_late_type_and_screen(fhir, tmp_path):
+    sr = scheduled("sr-1", "p1", "2026-10-19T00:00:00Z", "2026-10-20T08:00:00Z")
+    # Arrives one schedule hour after the surgery is booked: 1 s at 3600×
+    obs = type_and_screen("obs-1", "p1", "2026-10-19T01:00:00Z")
+    events = [(fhir_time.to_epoch(sr["authoredOn"]), sr), (fhir_time.to_epoch(obs["effectiveDateTime"]), obs)]
+
+    base = config.FHIR_BASE
+    changes = run_replay(events, speed=3600, poll=0.01, settle=5)
+    summary = summarize(changes, 3600)
+
+    assert [c["expected"][:2] for c in changes] == [(True, NO_TNS), (False, UP_TO_DATE)]
+    assert (summary["detected"], summary["superseded"], summary["missed"]) == (2, 0, 0)
+    assert summary["late_alerts"] == 0
+    # The replay's own stand-in must not leak into later callers
+    assert config.FHIR_BASE == base
+
+
+def test_load_events_orders_by_schedule_time(tmp_path):
+    path = tmp_path / "events.ndjson"
+    late = type_and_screen("obs-1", "p1", "2026-10-19T02:00:00Z")
+    early = scheduled("sr-1", "p1", "2026-10-19T00:00:00Z", "2026-10-20T08:00:00Z")
+    path.write_text(json.dumps(late) + "\n" + json.dumps(early) + "\n", encoding="utf-8")
+
+    assert [r["id"] for _, r in load_events([path])] == ["sr-1", "obs-1"]
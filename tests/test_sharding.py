@@ -0,0 +1,88 @@
+import json
+
+import pytest
+
+from conftest import surgery, type_and_screen
+from tns.evaluate import (
+    AlertWriter, claim_shard, merge_shards, open_queue, plan_shards, run_shard, shard_path,
+    shard_worker,
+)
+
+
+def run_sharded(work_dir, output, shards=2):
+    plan_shards(None, work_dir, shards)
+    shard_worker(work_dir)
+    with AlertWriter(output) as writer:
+        merge_shards(work_dir, writer)
+    with open(output, encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_on_completed_work_dir_fetches_again(fhir, tmp_path):
+    fhir.store.put(surgery("sr-1", "p1", "2026-10-20T08:00:00Z"))
+    fhir.store.put(type_and_screen("obs-1", "p1", "2026-10-19T08:00:00Z"))
+    work_dir = tmp_path / "shards"
+
+    first = run_sharded(work_dir, tmp_path / "first.ndjson")
+    assert [r["surgery_id"] for r in first] == ["sr-1"]
+
+    fhir.store.put(surgery("sr-2", "p2", "2026-10-20T09:00:00Z"))
+    second = run_sharded(work_dir, tmp_path / "second.ndjson")
+    assert [r["surgery_id"] for r in second] == ["sr-1", "sr-2"]
+    assert second[1]["alert"] is True
+
+
+def test_unfinished_plan_with_other_shard_count_is_refused(fhir, tmp_path):
+    fhir.store.put(surgery("sr-1", "p1", "2026-10-20T08:00:00Z"))
+    work_dir = tmp_path / "shards"
+    plan_shards(None, work_dir, 2)
+
+    with pytest.raises(SystemExit) as excinfo:
+        plan_shards(None, work_dir, 4)
+    assert excinfo.value.code == 1
+
+    db = open_queue(work_dir)
+    assert db.execute("SELECT COUNT(*) FROM shards").fetchone()[0] == 2
+    db.close()
+
+
+def test_worker_that_lost_its_shard_discards_output(fhir, tmp_path):
+    fhir.store.put(surgery("sr-1", "p1", "2026-10-20T08:00:00Z"))
+    work_dir = tmp_path / "shards"
+    plan_shards(None, work_dir, 1)
+
+    db = open_queue(work_dir)
+    shard = claim_shard(db, "host-a:1")
+    # Another worker decided host-a was dead and took the shard over
+    db.execute("UPDATE shards SET worker = 'host-b:2' WHERE shard = ?", (shard,))
+
+    assert run_shard(None, db, work_dir, shard, "host-a:1") is None
+    assert db.execute("SELECT status, worker FROM shards").fetchone() == ("running", "host-b:2")
+    db.close()
+
+    assert not shard_path(work_dir, shard, "alerts").exists()
+    assert not list(work_dir.glob("*.tmp"))
+
+
+def test_output_order_does_not_depend_on_server_order(fhir, tmp_path):
+    from tns import evaluate
+
+    # More than one ServiceRequest page, and patients spread over shards
+    surgeries = [surgery(f"sr-{n:03d}", f"p{n % 40}", "2026-10-20T08:00:00Z") for n in range(250)]
+    fhir.store.put(type_and_screen("obs-1", "p1", "2026-10-19T08:00:00Z"))
+
+    def reload(resources):
+        fhir.store._resources.pop("ServiceRequest", None)
+        for sr in resources:
+            fhir.store.put(dict(sr))
+
+    reload(surgeries)
+    evaluate.main(["--output", str(tmp_path / "first.ndjson")])
+    reload(reversed(surgeries))
+    evaluate.main(["--output", str(tmp_path / "second.ndjson")])
+    run_sharded(tmp_path / "shards", tmp_path / "sharded.ndjson", shards=3)
+
+    first = (tmp_path / "first.ndjson").read_bytes()
+    assert first.count(b"\n") == 250
+    assert (tmp_path / "second.ndjson").read_bytes() == first
+    assert (tmp_path / "sharded.ndjson").read_bytes() == first
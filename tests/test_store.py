@@ -0,0 +1,40 @@
+from tns.fhir_time import from_epoch
+from tns.store import TnsStore
+
+
+def test_grows_past_initial_capacity():
+    store = TnsStore(capacity=4)
+    for n in range(1000):
+        store.update(f"patient-{n}", n)
+
+    assert len(store) == 1000
+    assert all(store.latest_epoch(f"patient-{n}") == n for n in range(1000))
+    assert list(store.patient_ids())[:3] == ["patient-0", "patient-1", "patient-2"]
+
+
+def test_update_keeps_latest():
+    store = TnsStore()
+    store.update("p1", 200)
+    store.update("p1", 100)
+    assert store.latest_epoch("p1") == 200
+    store.update("p1", 300)
+    assert store.latest_epoch("p1") == 300
+    assert store.latest("p1") == from_epoch(300)
+
+
+def test_known_patient_without_tns():
+    store = TnsStore()
+    store.row("p1")
+    assert "p1" in store
+    assert store.latest_epoch("p1") is None
+    assert store.latest("p1") is None
+
+
+def test_contains():
+    store = TnsStore()
+    store.update("p1", 0)
+    assert "p1" in store
+    assert "p2" not in store
+    assert store.latest_epoch("p2") is None
+    # A T&S at the epoch itself is a real value, not "no T&S"
+    assert store.latest_epoch("p1") == 0
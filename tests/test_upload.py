@@ -0,0 +1,30 @@
+import json
+
+import pytest
+
+from conftest import surgery, type_and_screen
+from tns import upload
+
+
+def write_ndjson(path, resources):
+    path.write_text("".join(json.dumps(r) + "\n" for r in resources), encoding="utf-8")
+
+
+def test_surgeries_stop_at_first_failure(fhir, tmp_path):
+    path = tmp_path / "surgeries.ndjson"
+    write_ndjson(path, [surgery(f"sr-{n}", "p1", "2026-10-20T08:00:00Z") for n in range(3)])
+    fhir.fail_post.append(lambda p: p.startswith("/ServiceRequest"))
+
+    with pytest.raises(SystemExit) as excinfo:
+        upload.main(["surgeries", "--file", str(path)])
+    assert excinfo.value.code == 1
+    assert upload.upload_ndjson(None, path, "ServiceRequest", stop_on_failure=True) == (0, 1)
+
+
+def test_type_and_screen_keeps_going_after_a_failure(fhir, tmp_path):
+    path = tmp_path / "tns.ndjson"
+    write_ndjson(path, [type_and_screen(f"obs-{n}", "p1", "2026-10-19T08:00:00Z") for n in range(3)])
+    failures = iter([True])
+    fhir.fail_post.append(lambda p: next(failures, False))
+
+    assert upload.upload_ndjson(None, path, "Observation") == (2, 1)
@@ -0,0 +1,3 @@
+"""Type & Screen readiness alerts for scheduled surgeries, built on FHIR."""
+
+__version__ = "0.1.0"
@@ -0,0 +1,208 @@
+import json
+import os
+import uuid
+from pathlib import Path
+
+from tns import config, fhir_time
+from tns.fhir import auth_headers, session
+
+# ------------------------------------------
+# DIFFERENTIAL ALERTS
+# ------------------------------------------
+# The state file holds only the alerts that were active after the last
+# complete run, one NDJSON line each. Every run emits just what changed
+# against it:
+#
+#   new       alerting now, not alerting before (or newly scheduled)
+#   changed   alerting both times, but reason or latest T&S differs
+#   resolved  alerting before, now up to date or no longer scheduled
+#
+# Each saved alert also records "alert_since", when it first started
+# alerting, so its Flag keeps the same period.start across updates.
+
+NO_LONGER_SCHEDULED = "Surgery is no longer scheduled."
+
+# Flag resources per FHIR batch Bundle
+FLAG_BATCH_SIZE = 100
+
+# Namespace for deterministic Flag ids, so a surgery's alert always
+# maps to the same Flag and updates replace it in place
+FLAG_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "urn:tns:type-and-screen-alert")
+
+FLAG_CATEGORY = {
+    "coding": [{
+        "system": "http://terminology.hl7.org/CodeSystem/flag-category",
+        "code": "clinical",
+        "display": "Clinical"
+    }]
+}
+
+
+def load_state(path):
+    """Return {surgery_id: alert dict} from the last run, or {}."""
+    state = {}
+    if not Path(path).exists():
+        return state
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                result = json.loads(line)
+                state[result["surgery_id"]] = result
+    return state
+
+
+def save_state(active, path):
+    tmp_path = Path(f"{path}.tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for sid in sorted(active):
+            f.write(json.dumps(active[sid], sort_keys=True) + "\n")
+    os.replace(tmp_path, path)
+
+
+def alert_key(result):
+    return (result.get("reason"), result.get("latest_tns_time"))
+
+
+class FlagPublisher:
+    """Upserts one FHIR Flag per alerting surgery, in batched Bundles."""
+
+    def __init__(self, token, batch_size=FLAG_BATCH_SIZE):
+        self.token = token
+        self.batch_size = batch_size
+        self.entries = []
+        self.written = 0
+        self.failed = 0
+        self.failed_ids = set()   # surgery ids whose Flag was not written
+
+    def flag_for(self, record):
+        sid = record["surgery_id"]
+        resolved = record["change"] == "resolved"
+
+        period = {}
+        if record.get("alert_since"):
+            period["start"] = record["alert_since"]
+        if resolved:
+            period["end"] = fhir_time.format_fhir(fhir_time.utcnow())
+
+        return {
+            "resourceType": "Flag",
+            "id": str(uuid.uuid5(FLAG_ID_NAMESPACE, sid)),
+            "identifier": [{"system": "urn:tns:surgery", "value": sid}],
+            "status": "inactive" if resolved else "active",
+            "category": [FLAG_CATEGORY],
+            "code": {"text": record["reason"]},
+            "subject": {"reference": f"Patient/{record['patient_id']}"},
+            "period": period,
+        }
+
+    def add(self, record):
+        flag = self.flag_for(record)
+        self.entries.append({
+            "resource": flag,
+            "request": {"method": "PUT", "url": f"Flag/{flag['id']}"},
+        })
+        if len(self.entries) >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if not self.entries:
+            return
+
+        bundle = {"resourceType": "Bundle", "type": "batch", "entry": self.entries}
+        headers = auth_headers(self.token, content_type="application/fhir+json")
+        response = session().post(config.FHIR_BASE, headers=headers, json=bundle)
+
+        sids = [e["resource"]["identifier"][0]["value"] for e in self.entries]
+        self.entries = []
+
+        if response.status_code != 200:
+            print(f"❌ Flag batch failed ({response.status_code})")
+            print(response.text)
+            self.failed += len(sids)
+            self.failed_ids.update(sids)
+            return
+
+        # Batch responses are in request order
+        results = response.json().get("entry", [])
+        for n, sid in enumerate(sids):
+            status = results[n].get("response", {}).get("status", "") if n < len(results) else ""
+            if status.startswith("2"):
+                self.written += 1
+            else:
+                self.failed += 1
+                self.failed_ids.add(sid)
+
+
+class AlertDiffWriter:
+    """
+    Wraps an AlertWriter so only new / changed / resolved alerts are
+    written (each record carries a "change" field), optionally
+    mirrored to FHIR Flags. The state file is only replaced when the
+    run completes, so an interrupted run never marks unseen surgeries
+    as resolved. A surgery whose Flag could not be written keeps its
+    previous state, so the next run emits its change again.
+    """
+
+    def __init__(self, writer, state_path, publisher=None):
+        self.writer = writer
+        self.state_path = state_path
+        self.publisher = publisher
+        self.previous = load_state(state_path)
+        self.baseline = dict(self.previous)
+        self.active = {}
+        self.started = fhir_time.format_fhir(fhir_time.utcnow())
+        self.count = 0
+        self.alerts = 0
+        self.changes = {"new": 0, "changed": 0, "resolved": 0}
+
+    def _emit(self, change, result):
+        record = dict(result, change=change)
+        self.writer.write(record)
+        if self.publisher is not None:
+            self.publisher.add(record)
+        self.changes[change] += 1
+
+    def write(self, result):
+        self.count += 1
+        sid = result["surgery_id"]
+        prev = self.previous.pop(sid, None)
+        since = prev.get("alert_since") if prev else None
+
+        if result["alert"]:
+            self.alerts += 1
+            result = dict(result, alert_since=since or self.started)
+            self.active[sid] = result
+            if prev is None:
+                self._emit("new", result)
+            elif alert_key(prev) != alert_key(result):
+                self._emit("changed", result)
+        elif prev is not None:
+            self._emit("resolved", dict(result, alert_since=since))
+
+    def finish(self):
+        # Whatever is left was alerting last time but is no longer scheduled
+        for sid in sorted(self.previous):
+            prev = self.previous[sid]
+            self._emit("resolved", dict(prev, alert=False, reason=NO_LONGER_SCHEDULED))
+        self.previous = {}
+        if self.publisher is not None:
+            self.publisher.flush()
+            for sid in self.publisher.failed_ids:
+                if sid in self.baseline:
+                    self.active[sid] = self.baseline[sid]
+                else:
+                    self.active.pop(sid, None)
+        save_state(self.active, self.state_path)
+
+    def close(self):
+        self.writer.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, *exc):
+        try:
+            if exc_type is None:
+                self.finish()
+        finally:
+            self.close()
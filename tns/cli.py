@@ -0,0 +1,46 @@
+import importlib
+import sys
+
+# Subcommand -> (module, one-line help). Modules are only imported once
+# their subcommand is chosen, so e.g. `tns filter` never pays for
+# `requests`, and `tns --help` imports nothing but this file.
+COMMANDS = {
+    "filter": ("tns.filter", "Filter Type & Screen Observations out of NDJSON exports"),
+    "generate": ("tns.generate", "Generate synthetic T&S Observations or surgery ServiceRequests"),
+    "upload": ("tns.upload", "Upload synthetic NDJSON resources to the FHIR server"),
+    "evaluate": ("tns.evaluate", "Evaluate T&S readiness alerts for scheduled surgeries"),
+    "serve": ("tns.serve", "Run an in-memory FHIR stand-in for local testing"),
+    "replay": ("tns.replay", "Replay a generated schedule at N× speed and report alert latency"),
+}
+
+
+def usage():
+    lines = ["usage: tns <command> [options]", "", "commands:"]
+    width = max(len(name) for name in COMMANDS)
+    for name, (_, help_text) in COMMANDS.items():
+        lines.append(f"  {name:<{width}}  {help_text}")
+    lines.append("")
+    lines.append("Run `tns <command> --help` for command options.")
+    return "\n".join(lines)
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else list(argv)
+
+    if not argv or argv[0] in ("-h", "--help"):
+        print(usage())
+        return
+
+    if argv[0] == "--version":
+        from tns import __version__
+        print(f"tns {__version__}")
+        return
+
+    command = COMMANDS.get(argv[0])
+    if command is None:
+        print(f"tns: unknown command '{argv[0]}'\n", file=sys.stderr)
+        print(usage(), file=sys.stderr)
+        raise SystemExit(2)
+
+    module = importlib.import_module(command[0])
+    return module.main(argv[1:])
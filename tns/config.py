@@ -0,0 +1,45 @@
+import os
+
+# ------------------------------------------
+# CONFIGURATION
+# ------------------------------------------
+# Shared by every subcommand and read once per process. Each value can
+# be overridden from the environment so cron/orchestration jobs don't
+# need to edit code.
+
+FHIR_BASE = os.environ.get(
+    "TNS_FHIR_BASE",
+    "https://fhirserver33-fhirservice333.fhir.azurehealthcareapis.com"
+).rstrip("/")
+
+# "az" mints bearer tokens with the Azure CLI; "none" sends no
+# Authorization header (e.g. against `tns serve` or a local HAPI-FHIR)
+AUTH = os.environ.get("TNS_AUTH", "az")
+
+AZ_PATH = os.environ.get(
+    "TNS_AZ_PATH",
+    r"C:\Program Files (x86)\Microsoft SDKs\Azure\CLI2\wbin\az.cmd"
+)
+
+# LOINC codes for Type & Screen components
+TNS_CODES = [
+    "883-9",     # ABO group
+    "10331-7",   # Rh type
+    "890-4"      # Antibody screen
+]
+
+# Sort for the ServiceRequest search. Alert files and the sharded merge
+# follow fetch order, so this must give the same order on every run;
+# use a key the server supports that never ties, such as _id
+SURGERY_SORT = os.environ.get("TNS_SURGERY_SORT", "_id")
+
+# How long a Type & Screen is valid before surgery
+TNS_VALID_HOURS = int(os.environ.get("TNS_VALID_HOURS", "72"))
+
+# Default file names shared between the generate / filter / upload /
+# evaluate steps
+PATIENT_FILE = "MimicPatient.ndjson"
+TNS_FILE = "synthetic_type_and_screen_observations.ndjson"
+SURGERY_FILE = "synthetic_surgery_requests.ndjson"
+FILTERED_TNS_FILE = "filtered_type_and_screen_observations.ndjson"
+ALERTS_FILE = "tns_alerts.ndjson"
@@ -0,0 +1,619 @@
+import argparse
+import heapq
+import json
+import os
+import socket
+import sqlite3
+import time
+import zlib
+from datetime import timedelta
+from pathlib import Path
+
+from tns import config, fhir_time
+from tns.fhir import auth_headers, get_access_token, session
+
+# ------------------------------------------
+# CONFIGURATION
+# ------------------------------------------
+
+# Sharded mode: a running shard whose worker has not checked in for
+# this long is assumed dead and handed to the next worker
+SHARD_STALE_SECONDS = 600
+SHARD_HEARTBEAT_EVERY = 50
+
+
+# ------------------------------------------
+# FETCH FHIR DATA
+# ------------------------------------------
+
+class FhirFetchError(RuntimeError):
+    """A search page could not be fetched, so any results are incomplete."""
+
+
+def iter_bundle_pages(token, url, what):
+    """
+    Yield search result Bundles one page at a time, following "next"
+    links. Only the current page is ever held in memory. Raises
+    FhirFetchError if a page fails, rather than ending early and
+    passing off a partial result set as complete.
+    """
+
+    headers = auth_headers(token)
+
+    while url:
+        response = session().get(url, headers=headers)
+        if response.status_code != 200:
+            print(response.text)
+            raise FhirFetchError(f"Failed to fetch {what}: {response.status_code}")
+
+        bundle = response.json()
+        yield bundle
+
+        # Pagination
+        next_url = None
+        for link in bundle.get("link", []):
+            if link.get("relation") == "next":
+                next_url = link.get("url")
+                break
+
+        url = next_url
+
+
+def iter_resources(bundle, resource_type):
+    for entry in bundle.get("entry", []):
+        res = entry.get("resource", {})
+        if res.get("resourceType") == resource_type:
+            yield res
+
+
+def iter_surgery_requests(token):
+    """
+    Stream all ServiceRequests from the FHIR server, in a stable order
+    (config.SURGERY_SORT). These are our synthetic surgeries.
+    """
+
+    url = f"{config.FHIR_BASE}/ServiceRequest?_sort={config.SURGERY_SORT}&_count=200"
+
+    for bundle in iter_bundle_pages(token, url, "ServiceRequests"):
+        yield from iter_resources(bundle, "ServiceRequest")
+
+
+def iter_tns_pages(token, patient_id):
+    """
+    Stream pages of Observations with T&S LOINC codes for a specific
+    patient, sorted newest → oldest via _sort=-date. Each page is a
+    list of Observations.
+    """
+
+    # Build the multi-code query parameter
+    code_param = ",".join([f"http://loinc.org|{c}" for c in config.TNS_CODES])
+
+    url = (
+        f"{config.FHIR_BASE}/Observation"
+        f"?subject=Patient/{patient_id}"
+        f"&code={code_param}"
+        f"&_sort=-date"
+        f"&_count=50"
+    )
+
+    what = f"Observations for patient {patient_id}"
+    for bundle in iter_bundle_pages(token, url, what):
+        yield list(iter_resources(bundle, "Observation"))
+
+
+# ------------------------------------------
+# ALERT LOGIC
+# ------------------------------------------
+
+def evaluate_surgery(token, sr):
+    """
+    Main logic:
+    - Identify the patient and surgery time
+    - Find latest T&S before the surgery
+    - Determine if T&S is missing or too old
+    """
+
+    subject = sr.get("subject", {})
+    ref = subject.get("reference")
+
+    if not ref or not ref.startswith("Patient/"):
+        return None
+
+    patient_id = ref.split("/")[1]
+
+    # Surgery date/time
+    surgery_time_str = sr.get("occurrenceDateTime")
+    if not surgery_time_str:
+        return None
+
+    # Compare as aware datetimes so offsets and naive timestamps can
+    # never be mixed up, and a result at 10:00:00.9 still counts as
+    # after a 10:00:00 surgery
+    surgery_time = fhir_time.parse(surgery_time_str)
+
+    latest_tns_time = None
+
+    # Get patient’s T&S Observations, newest first
+    for observations in iter_tns_pages(token, patient_id):
+        for obs in observations:
+            eff = obs.get("effectiveDateTime")
+            if not eff:
+                continue
+
+            try:
+                eff_time = fhir_time.parse(eff)
+            except ValueError:
+                continue
+
+            # Only count T&S BEFORE surgery
+            if eff_time > surgery_time:
+                continue
+
+            if latest_tns_time is None or eff_time > latest_tns_time:
+                latest_tns_time = eff_time
+
+        # Pages are sorted newest first, so once a page has produced a
+        # pre-surgery T&S, later pages can only hold older ones
+        if latest_tns_time is not None:
+            break
+
+    return build_result(sr, patient_id, surgery_time, latest_tns_time)
+
+
+def build_result(sr, patient_id, surgery_time, latest_tns_time):
+    """
+    Apply the alert conditions to one surgery. Times are aware
+    datetimes; latest_tns_time is the newest T&S before surgery, or
+    None.
+    """
+
+    window_start = surgery_time - timedelta(hours=config.TNS_VALID_HOURS)
+
+    # ----------------------------------
+    # Alert Conditions
+    # ----------------------------------
+
+    if latest_tns_time is None:
+        return {
+            "patient_id": patient_id,
+            "surgery_id": sr.get("id"),
+            "surgery_time": fhir_time.format_fhir(surgery_time),
+            "alert": True,
+            "reason": "No Type & Screen on file before surgery."
+        }
+
+    if latest_tns_time < window_start:
+        return {
+            "patient_id": patient_id,
+            "surgery_id": sr.get("id"),
+            "surgery_time": fhir_time.format_fhir(surgery_time),
+            "latest_tns_time": fhir_time.format_fhir(latest_tns_time),
+            "alert": True,
+            "reason": f"Latest Type & Screen is older than {config.TNS_VALID_HOURS} hours."
+        }
+
+    # If we reach here → T&S is valid
+    return {
+        "patient_id": patient_id,
+        "surgery_id": sr.get("id"),
+        "surgery_time": fhir_time.format_fhir(surgery_time),
+        "latest_tns_time": fhir_time.format_fhir(latest_tns_time),
+        "alert": False,
+        "reason": "Type & Screen is up to date."
+    }
+
+
+def iter_alerts(token, surgeries):
+    """Evaluate a stream of ServiceRequests, yielding each result."""
+    for sr in surgeries:
+        result = evaluate_surgery(token, sr)
+        if result:
+            yield result
+
+
+# ------------------------------------------
+# OUTPUT
+# ------------------------------------------
+
+# Column order for CSV output
+ALERT_FIELDS = ["surgery_id", "patient_id", "surgery_time", "latest_tns_time", "alert", "reason"]
+
+
+class AlertWriter:
+    """
+    Streams alert dicts to NDJSON (default) or CSV (.csv paths).
+
+    Every record is flushed as soon as it is written, so an interrupted
+    run leaves a file that is valid up to the last complete line.
+    """
+
+    def __init__(self, path, fields=ALERT_FIELDS):
+        self.path = path
+        self.count = 0
+        self.alerts = 0
+        self._f = open(path, "w", encoding="utf-8", newline="")
+        self._csv = None
+        if str(path).lower().endswith(".csv"):
+            import csv
+            self._csv = csv.DictWriter(self._f, fieldnames=fields, extrasaction="ignore")
+            self._csv.writeheader()
+
+    def write(self, result):
+        if self._csv is not None:
+            self._csv.writerow(result)
+        else:
+            self._f.write(json.dumps(result, sort_keys=True) + "\n")
+        self._f.flush()
+        self.count += 1
+        self.alerts += bool(result.get("alert"))
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_ndjson(path):
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                yield json.loads(line)
+
+
+# ------------------------------------------
+# SHARDED MODE
+# ------------------------------------------
+#
+# work-dir/
+#   queue.sqlite              shard status (pending / running / done)
+#   shard-0000.requests.ndjson  {"seq", "request"} for shard 0
+#   shard-0000.alerts.ndjson    {"seq", "result"} for shard 0
+#
+# Workers (local processes or other hosts sharing work-dir) claim
+# shards from the queue. Shard output is only renamed into place once
+# complete, and only by the worker that still owns the shard, so a
+# killed or stalled worker leaves its shard to be re-run. "seq" is
+# each ServiceRequest's position in the original fetch; every shard
+# file is in seq order, so the merge is a streaming k-way merge that
+# reproduces the single-process output exactly.
+
+def shard_for_patient(patient_ref, num_shards):
+    """Stable shard number for a patient, identical on every host."""
+    return zlib.crc32(patient_ref.encode("utf-8")) % num_shards
+
+
+def shard_path(work_dir, shard, kind):
+    return Path(work_dir) / f"shard-{shard:04d}.{kind}.ndjson"
+
+
+def open_queue(work_dir):
+    db = sqlite3.connect(str(Path(work_dir) / "queue.sqlite"), timeout=60, isolation_level=None)
+    db.execute(
+        "CREATE TABLE IF NOT EXISTS shards ("
+        " shard INTEGER PRIMARY KEY,"
+        " status TEXT NOT NULL DEFAULT 'pending',"
+        " worker TEXT,"
+        " heartbeat REAL)"
+    )
+    return db
+
+
+def clear_plan(db, work_dir):
+    """Forget a plan and delete its shard files."""
+    db.execute("DELETE FROM shards")
+    for path in Path(work_dir).glob("shard-*.ndjson*"):
+        path.unlink()
+
+
+def plan_shards(token, work_dir, num_shards):
+    """
+    Fetch every ServiceRequest once and split them into shard files.
+
+    A plan with unfinished shards is resumed (it must have the same
+    shard count). A fully finished plan belongs to an earlier run and
+    is cleared, so every run evaluates the current schedule.
+    """
+    work_dir = Path(work_dir)
+    work_dir.mkdir(parents=True, exist_ok=True)
+
+    db = open_queue(work_dir)
+    planned, unfinished = db.execute(
+        "SELECT COUNT(*), COALESCE(SUM(status != 'done'), 0) FROM shards"
+    ).fetchone()
+
+    if unfinished:
+        db.close()
+        if planned != num_shards:
+            print(f"❌ {work_dir} holds an unfinished plan with {planned} shards, "
+                  f"not {num_shards}. Re-run with --shards {planned} to finish it.")
+            raise SystemExit(1)
+        print(f"Resuming unfinished plan in {work_dir} ({unfinished} of {planned} shards left)")
+        return
+
+    if planned:
+        clear_plan(db, work_dir)
+
+    files = [open(shard_path(work_dir, n, "requests"), "w", encoding="utf-8")
+             for n in range(num_shards)]
+    total = 0
+    try:
+        for seq, sr in enumerate(iter_surgery_requests(token)):
+            ref = sr.get("subject", {}).get("reference") or ""
+            record = {"seq": seq, "request": sr}
+            files[shard_for_patient(ref, num_shards)].write(json.dumps(record) + "\n")
+            total += 1
+    finally:
+        for f in files:
+            f.close()
+
+    db.executemany("INSERT INTO shards (shard) VALUES (?)", [(n,) for n in range(num_shards)])
+    db.close()
+    print(f"Planned {total} surgeries across {num_shards} shards in {work_dir}")
+
+
+def claim_shard(db, worker):
+    """Atomically take the next pending (or abandoned) shard, or None."""
+    now = time.time()
+    db.execute("BEGIN IMMEDIATE")
+    try:
+        row = db.execute(
+            "SELECT shard FROM shards"
+            " WHERE status = 'pending'"
+            "    OR (status = 'running' AND heartbeat < ?)"
+            " ORDER BY shard LIMIT 1",
+            (now - SHARD_STALE_SECONDS,)
+        ).fetchone()
+        if row is not None:
+            db.execute(
+                "UPDATE shards SET status = 'running', worker = ?, heartbeat = ? WHERE shard = ?",
+                (worker, now, row[0])
+            )
+        db.execute("COMMIT")
+    except Exception:
+        db.execute("ROLLBACK")
+        raise
+    return None if row is None else row[0]
+
+
+def heartbeat(db, shard, worker):
+    """Refresh our claim on shard; False once another worker has taken it."""
+    cursor = db.execute(
+        "UPDATE shards SET heartbeat = ? WHERE shard = ? AND worker = ? AND status = 'running'",
+        (time.time(), shard, worker)
+    )
+    return cursor.rowcount == 1
+
+
+def run_shard(token, db, work_dir, shard, worker):
+    """
+    Evaluate one claimed shard. Returns the result count, or None if
+    the shard was reassigned (our heartbeat went stale) before we
+    finished, in which case our output is discarded.
+    """
+    out_path = shard_path(work_dir, shard, "alerts")
+    # Per-worker temp file: a stale worker and the one that took over
+    # its shard must never write to the same file
+    tmp_path = Path(f"{out_path}.{worker.replace(':', '-')}.tmp")
+    count = 0
+
+    try:
+        with open(tmp_path, "w", encoding="utf-8") as out_f:
+            records = read_ndjson(shard_path(work_dir, shard, "requests"))
+            for n, record in enumerate(records, start=1):
+                result = evaluate_surgery(token, record["request"])
+                if result:
+                    out_f.write(json.dumps({"seq": record["seq"], "result": result}) + "\n")
+                    count += 1
+                if n % SHARD_HEARTBEAT_EVERY == 0 and not heartbeat(db, shard, worker):
+                    return None
+
+        # Publish and mark done in one transaction, and only while the
+        # shard is still ours
+        db.execute("BEGIN IMMEDIATE")
+        try:
+            if not heartbeat(db, shard, worker):
+                db.execute("ROLLBACK")
+                return None
+            os.replace(tmp_path, out_path)
+            db.execute(
+                "UPDATE shards SET status = 'done', heartbeat = ? WHERE shard = ? AND worker = ?",
+                (time.time(), shard, worker)
+            )
+            db.execute("COMMIT")
+        except Exception:
+            db.execute("ROLLBACK")
+            raise
+        return count
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def shard_worker(work_dir, worker=None):
+    """Process shards until the queue has nothing left to claim."""
+    worker = worker or f"{socket.gethostname()}:{os.getpid()}"
+    token = get_access_token()
+    db = open_queue(work_dir)
+    try:
+        while True:
+            shard = claim_shard(db, worker)
+            if shard is None:
+                break
+            try:
+                count = run_shard(token, db, work_dir, shard, worker)
+            except Exception:
+                # Hand the shard straight back rather than leaving it to
+                # go stale, so a re-run can pick it up at once
+                db.execute(
+                    "UPDATE shards SET status = 'pending', worker = NULL WHERE shard = ? AND worker = ?",
+                    (shard, worker)
+                )
+                raise
+            if count is None:
+                print(f"⚠️ [{worker}] shard {shard} was taken over by another worker; dropped our output")
+            else:
+                print(f"[{worker}] shard {shard}: {count} results")
+    finally:
+        db.close()
+
+
+def merge_shards(work_dir, writer):
+    """Stream every shard's results, in original fetch order, into writer."""
+    db = open_queue(work_dir)
+    rows = db.execute("SELECT shard, status FROM shards ORDER BY shard").fetchall()
+    db.close()
+
+    unfinished = [shard for shard, status in rows if status != "done"]
+    if not rows or unfinished:
+        print(f"❌ Cannot merge: shards not done: {unfinished or 'no plan found'}")
+        raise SystemExit(1)
+
+    streams = [read_ndjson(shard_path(work_dir, shard, "alerts")) for shard, _ in rows]
+    for record in heapq.merge(*streams, key=lambda r: r["seq"]):
+        writer.write(record["result"])
+
+
+# ------------------------------------------
+# MAIN ENTRY POINT
+# ------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns evaluate",
+        description="Evaluate Type & Screen readiness for scheduled surgeries."
+    )
+    parser.add_argument(
+        "--output", default=config.ALERTS_FILE,
+        help="Alert file to write: NDJSON, or CSV if the name ends in .csv"
+    )
+    parser.add_argument(
+        "--state",
+        help="Differential mode: compare against the alerts saved in this file "
+             "and write only new / changed / resolved alerts to --output"
+    )
+    parser.add_argument(
+        "--publish-flags", action="store_true",
+        help="With --state, also upsert each change as a FHIR Flag in batch Bundles"
+    )
+    parser.add_argument(
+        "--flag-batch-size", type=int,
+        help="Flags per batch Bundle (default 100)"
+    )
+    parser.add_argument(
+        "--shards", type=int, default=1,
+        help="Partition patients into N shards (enables sharded mode)"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=os.cpu_count() or 1,
+        help="Local worker processes in sharded mode"
+    )
+    parser.add_argument(
+        "--work-dir", default="tns_shards",
+        help="Shared directory holding the shard queue and shard files"
+    )
+    parser.add_argument(
+        "--worker", action="store_true",
+        help="Only process shards from an existing plan (e.g. on another host)"
+    )
+    parser.add_argument(
+        "--merge", action="store_true",
+        help="Only merge finished shards into --output"
+    )
+    return parser.parse_args(argv)
+
+
+def open_sink(args, token):
+    """AlertWriter for --output, wrapped for differential mode if asked."""
+    if not args.state:
+        return AlertWriter(args.output)
+
+    from tns.alert_diff import FLAG_BATCH_SIZE, AlertDiffWriter, FlagPublisher
+
+    publisher = None
+    if args.publish_flags:
+        publisher = FlagPublisher(token, batch_size=args.flag_batch_size or FLAG_BATCH_SIZE)
+    writer = AlertWriter(args.output, fields=["change", *ALERT_FIELDS, "alert_since"])
+    return AlertDiffWriter(writer, args.state, publisher)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    if args.publish_flags and not args.state:
+        print("❌ --publish-flags needs --state to know what changed")
+        raise SystemExit(2)
+
+    if args.worker:
+        try:
+            shard_worker(args.work_dir)
+        except FhirFetchError as e:
+            print(f"❌ {e}")
+            raise SystemExit(1)
+        return
+
+    if args.merge:
+        token = get_access_token() if args.publish_flags else None
+        with open_sink(args, token) as writer:
+            merge_shards(args.work_dir, writer)
+        print(f"✅ Merged {writer.count} results into {args.output}")
+        if args.state:
+            report_changes(writer)
+        return
+
+    print("🔐 Getting access token...")
+    token = get_access_token()
+
+    try:
+        if args.shards > 1:
+            import multiprocessing
+
+            plan_shards(token, args.work_dir, args.shards)
+            # spawn, not fork: workers must not inherit the parent's HTTP session
+            ctx = multiprocessing.get_context("spawn")
+            workers = [
+                ctx.Process(target=shard_worker, args=(args.work_dir,))
+                for _ in range(min(args.workers, args.shards))
+            ]
+            for w in workers:
+                w.start()
+            for w in workers:
+                w.join()
+            if any(w.exitcode != 0 for w in workers):
+                print("❌ A shard worker failed; re-run to finish the remaining shards")
+                raise SystemExit(1)
+            with open_sink(args, token) as writer:
+                merge_shards(args.work_dir, writer)
+        else:
+            # page → ServiceRequest → patient lookup → alert → writer,
+            # one surgery at a time
+            print("📥 Streaming surgeries...")
+            with open_sink(args, token) as writer:
+                for result in iter_alerts(token, iter_surgery_requests(token)):
+                    writer.write(result)
+    except FhirFetchError as e:
+        # The writer was closed without finishing: in differential mode
+        # nothing was marked resolved and the state file is untouched
+        print(f"❌ {e}")
+        print("❌ Run incomplete" + ("; state not updated" if args.state else ""))
+        raise SystemExit(1)
+
+    print(f"✅ Evaluated {writer.count} surgeries, {writer.alerts} alerts → {args.output}")
+    if args.state:
+        report_changes(writer)
+
+
+def report_changes(writer):
+    changes = writer.changes
+    print(f"   Changes since last run: {changes['new']} new, "
+          f"{changes['changed']} changed, {changes['resolved']} resolved")
+    if writer.publisher is not None:
+        print(f"   Flags written: {writer.publisher.written}, failed: {writer.publisher.failed}")
+        if writer.publisher.failed:
+            print("❌ Some Flags were not written; those changes will be retried next run")
+            raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
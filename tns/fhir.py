@@ -0,0 +1,59 @@
+import json
+
+from tns import config
+
+# ------------------------------------------
+# AUTH + HTTP HELPERS
+# ------------------------------------------
+# `requests` and `subprocess` are imported on first use so that
+# subcommands which never talk to the server start quickly.
+
+_session = None
+
+
+def get_access_token():
+    """
+    Uses Azure CLI to get a Bearer token for authenticating
+    to the Azure FHIR server. Returns None when TNS_AUTH=none.
+    """
+    if config.AUTH == "none":
+        return None
+
+    import subprocess
+
+    result = subprocess.run(
+        [
+            config.AZ_PATH,
+            "account", "get-access-token",
+            "--resource", config.FHIR_BASE,
+            "--output", "json"
+        ],
+        capture_output=True,
+        text=True
+    )
+
+    if result.returncode != 0:
+        print("❌ Failed to get access token.")
+        print(result.stderr)
+        raise SystemExit(1)
+
+    token_info = json.loads(result.stdout)
+    return token_info["accessToken"]
+
+
+def auth_headers(token, content_type=None):
+    headers = {}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    if content_type:
+        headers["Content-Type"] = content_type
+    return headers
+
+
+def session():
+    """Shared requests.Session (one per process) for connection reuse."""
+    global _session
+    if _session is None:
+        import requests
+        _session = requests.Session()
+    return _session
@@ -0,0 +1,88 @@
+from array import array
+from datetime import datetime, timedelta, timezone
+
+# Naive values (no offset) are treated as UTC, which is what the
+# synthetic generators have always meant when they wrote utcnow() + "Z".
+#
+# Hot loops compare aware datetimes from parse(), which keep fractional
+# seconds. Integer epoch seconds (floored) are for compact storage.
+
+EPOCH = datetime(1970, 1, 1, tzinfo=timezone.utc)
+
+# parse_many() places this at positions whose value is missing or
+# unparseable, so its output always lines up with its input
+NO_EPOCH = -(2 ** 63)
+
+_fromisoformat = datetime.fromisoformat
+
+
+def parse(value):
+    """
+    Convert a FHIR dateTime string into an aware datetime, keeping any
+    fraction of a second. This is the hot-path form: the evaluator
+    compares these directly, and aware datetimes with different offsets
+    compare correctly. Raises ValueError for unparseable strings.
+    """
+    # Since 3.11 fromisoformat() takes "Z", offsets and fractions
+    # itself, so the common case is a single C call
+    dt = _fromisoformat(value)
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return dt
+
+
+def to_epoch(value):
+    """
+    Convert a FHIR dateTime string or datetime into integer epoch
+    seconds, flooring any fraction. Raises ValueError for unparseable
+    strings.
+    """
+    if isinstance(value, str):
+        value = _fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+
+    # timedelta keeps seconds in [0, 86400) and drops the fraction into
+    # microseconds, so days * 86400 + seconds is already the floor
+    d = value - EPOCH
+    return d.days * 86400 + d.seconds
+
+
+def parse_many(values):
+    """
+    Batch-convert FHIR dateTime strings into an array('q') of epoch
+    seconds, one per input value. Missing or unparseable values become
+    NO_EPOCH.
+    """
+    out = array("q", bytes(8 * len(values)))
+    fromisoformat, epoch, utc = _fromisoformat, EPOCH, timezone.utc
+    for n, value in enumerate(values):
+        try:
+            dt = fromisoformat(value)
+        except (TypeError, ValueError):
+            out[n] = NO_EPOCH
+            continue
+        if dt.tzinfo is None:
+            dt = dt.replace(tzinfo=utc)
+        d = dt - epoch
+        out[n] = d.days * 86400 + d.seconds
+    return out
+
+
+def from_epoch(seconds):
+    """Convert integer epoch seconds into an aware UTC datetime."""
+    return EPOCH + timedelta(seconds=seconds)
+
+
+def format_fhir(value):
+    """Format a datetime or epoch seconds as "YYYY-MM-DDTHH:MM:SSZ"."""
+    if not isinstance(value, datetime):
+        value = from_epoch(value)
+    elif value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+def utcnow():
+    """Current time as an aware UTC datetime, truncated to seconds."""
+    return datetime.now(timezone.utc).replace(microsecond=0)
@@ -0,0 +1,321 @@
+import argparse
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import glob
+import tempfile
+from pathlib import Path
+
+from tns import config
+
+TARGET_LOINC_CODES = config.TNS_CODES
+
+
+# ---- CONFIG ----
+# Output file name that your upload script was expecting:
+OUTPUT_FILE = config.FILTERED_TNS_FILE
+
+# Keywords we’ll look for in the observation code text/display
+TYPE_SCREEN_KEYWORDS = [
+    "TYPE AND SCREEN",
+    "TYPE & SCREEN",
+    "TYPE&SCREEN",
+    "T&S",
+    "T AND S",
+    "ABO/RH",
+    "ABO RH",
+    "ABORH",
+    "ANTIBODY SCREEN",
+    "ABO GROUP",
+    "RH TYPE"
+]
+
+# Sizing for the in-memory Bloom filter used by duplicate elimination.
+# Memory is fixed up front: ~1.2 MB per million expected records at 1%.
+EXPECTED_RECORDS = 10_000_000
+BLOOM_FALSE_POSITIVE_RATE = 0.01
+
+# How many new keys to buffer before writing them to the on-disk set
+SPILL_BATCH_SIZE = 50_000
+
+
+def is_type_and_screen(obs: dict) -> bool:
+    if obs.get("resourceType") != "Observation":
+        return False
+
+    code = obs.get("code", {})
+    for coding in code.get("coding", []):
+        if coding.get("system") == "http://loinc.org" and coding.get("code") in TARGET_LOINC_CODES:
+            return True
+
+    return False
+
+
+    code = obs.get("code", {})
+    strings_to_check = []
+
+    # code.text
+    text = code.get("text")
+    if isinstance(text, str):
+        strings_to_check.append(text)
+
+    # code.coding[*].display / code / text
+    for coding in code.get("coding", []):
+        for key in ["display", "code", "text"]:
+            val = coding.get(key)
+            if isinstance(val, str):
+                strings_to_check.append(val)
+
+    # Optional: also check category text/display if present
+    for cat in obs.get("category", []):
+        if isinstance(cat, dict):
+            if isinstance(cat.get("text"), str):
+                strings_to_check.append(cat["text"])
+            for coding in cat.get("coding", []):
+                for key in ["display", "code", "text"]:
+                    val = coding.get(key)
+                    if isinstance(val, str):
+                        strings_to_check.append(val)
+
+    # Normalize and match
+    upper_keywords = [k.upper() for k in TYPE_SCREEN_KEYWORDS]
+
+    for s in strings_to_check:
+        s_up = s.upper()
+        if any(kw in s_up for kw in upper_keywords):
+            return True
+
+    return False
+
+
+# ------------------------------------------
+# DUPLICATE ELIMINATION
+# ------------------------------------------
+
+def dedup_key(obj: dict) -> bytes:
+    """
+    16-byte identity of a resource across exports.
+
+    Resources with an id are keyed on type/id plus meta.versionId, or
+    plus a hash of their content (meta excluded, since lastUpdated
+    changes between exports) when no versionId is present. Resources
+    without an id are keyed on content alone.
+    """
+    rid = obj.get("id")
+    version = (obj.get("meta") or {}).get("versionId")
+
+    if rid and version:
+        ident = f"{obj.get('resourceType')}/{rid}/_history/{version}"
+    else:
+        content = {k: v for k, v in obj.items() if k != "meta"}
+        ident = f"{obj.get('resourceType')}/{rid or ''}#" + json.dumps(
+            content, sort_keys=True, separators=(",", ":")
+        )
+
+    return hashlib.blake2b(ident.encode("utf-8"), digest_size=16).digest()
+
+
+class SeenSet:
+    """
+    Bounded-memory set of dedup keys.
+
+    A fixed-size Bloom filter answers "definitely new" in memory for
+    almost every unseen key. Every key is also spilled to an SQLite
+    table on disk, which is consulted only when the Bloom filter says
+    "maybe seen", so results are exact while RAM stays constant.
+
+    Spilled keys stay in one open transaction until commit(), which the
+    caller makes only once the output holding those records is safely
+    on disk. A crash therefore rolls the keys back instead of leaving
+    them marked seen with their records lost. Pass durable=False for a
+    throwaway database to skip journaling.
+    """
+
+    def __init__(self, db_path, expected_records=EXPECTED_RECORDS,
+                 false_positive_rate=BLOOM_FALSE_POSITIVE_RATE, durable=True):
+        n = max(expected_records, 1)
+        self.num_bits = max(int(-n * math.log(false_positive_rate) / math.log(2) ** 2), 8)
+        self.num_hashes = max(round(self.num_bits / n * math.log(2)), 1)
+        self.bits = bytearray((self.num_bits + 7) // 8)
+
+        self.db = sqlite3.connect(str(db_path))
+        if not durable:
+            self.db.execute("PRAGMA journal_mode=OFF")
+            self.db.execute("PRAGMA synchronous=OFF")
+        self.db.execute(
+            "CREATE TABLE IF NOT EXISTS seen (key BLOB PRIMARY KEY) WITHOUT ROWID"
+        )
+        self.pending = set()
+
+        # Warm the Bloom filter from keys left by a previous run
+        for (key,) in self.db.execute("SELECT key FROM seen"):
+            self._set_bits(key)
+
+    def _positions(self, key):
+        # Double hashing over the two halves of the 128-bit key
+        h1 = int.from_bytes(key[:8], "little")
+        h2 = int.from_bytes(key[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def _set_bits(self, key):
+        for pos in self._positions(key):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+
+    def _maybe_seen(self, key):
+        return all(self.bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def add(self, key: bytes) -> bool:
+        """Record key; return True if it had not been seen before."""
+        if self._maybe_seen(key):
+            if key in self.pending:
+                return False
+            row = self.db.execute("SELECT 1 FROM seen WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                return False
+
+        self._set_bits(key)
+        self.pending.add(key)
+        if len(self.pending) >= SPILL_BATCH_SIZE:
+            self.spill()
+        return True
+
+    def spill(self):
+        """Move pending keys to the database, inside the open transaction."""
+        self.db.executemany(
+            "INSERT OR IGNORE INTO seen (key) VALUES (?)",
+            ((k,) for k in self.pending),
+        )
+        self.pending.clear()
+
+    def commit(self):
+        self.spill()
+        self.db.commit()
+
+    def close(self):
+        """Close without committing; uncommitted keys are rolled back."""
+        self.db.close()
+
+
+# ------------------------------------------
+# MAIN ENTRY POINT
+# ------------------------------------------
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns filter",
+        description="Filter Type & Screen Observations out of FHIR NDJSON exports."
+    )
+    parser.add_argument(
+        "patterns", nargs="*", default=["*.ndjson"],
+        help="Input files or globs (default: *.ndjson)"
+    )
+    parser.add_argument(
+        "--no-dedup", action="store_true",
+        help="Write every matching Observation, even repeats across exports"
+    )
+    parser.add_argument(
+        "--expected-records", type=int, default=EXPECTED_RECORDS,
+        help="Bloom filter sizing; memory is ~1.2 MB per million records"
+    )
+    parser.add_argument(
+        "--seen-db",
+        help="SQLite file for seen keys; reuse it to dedup against earlier runs "
+             "(default: temporary file)"
+    )
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    input_patterns = args.patterns
+
+    # Expand globs (e.g. observations-*.ndjson)
+    input_files = []
+    for pattern in input_patterns:
+        input_files.extend(glob.glob(pattern))
+
+    if not input_files:
+        print("No NDJSON files found. Pass file names, e.g.:")
+        print("  tns filter observations-*.ndjson")
+        return
+    # Don't use our own filtered output file as input
+    input_files = [f for f in input_files if f != OUTPUT_FILE]
+
+    print("Input files:")
+    for f in input_files:
+        print("  -", f)
+
+    out_path = Path(OUTPUT_FILE)
+    if out_path.exists():
+        if args.seen_db and not args.no_dedup:
+            # Its records are already marked seen in --seen-db, so if we
+            # replaced the file they would never be written again
+            print(f"❌ {OUTPUT_FILE} is still here from an earlier run whose records are "
+                  f"already recorded in {args.seen_db}.")
+            print("   Upload it and move it out of the way, then run the filter again.")
+            raise SystemExit(1)
+        print(f"WARNING: Overwriting existing file: {OUTPUT_FILE}")
+    # The previous output stays in place until this run has finished
+    tmp_path = Path(f"{OUTPUT_FILE}.tmp")
+
+    total_in = 0
+    total_out = 0
+    total_dupes = 0
+
+    seen = None
+    tmp_dir = None
+    if not args.no_dedup:
+        if args.seen_db:
+            db_path = args.seen_db
+        else:
+            tmp_dir = tempfile.TemporaryDirectory(prefix="tns-dedup-")
+            db_path = Path(tmp_dir.name) / "seen.sqlite"
+        seen = SeenSet(db_path, expected_records=args.expected_records,
+                       durable=bool(args.seen_db))
+
+    with open(tmp_path, "w", encoding="utf-8") as out_f:
+        for file in input_files:
+            print(f"Processing {file} ...")
+            with open(file, "r", encoding="utf-8") as in_f:
+                for line in in_f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    try:
+                        obj = json.loads(line)
+                    except json.JSONDecodeError:
+                        # Skip bad lines
+                        continue
+
+                    total_in += 1
+                    if is_type_and_screen(obj):
+                        if seen is not None and not seen.add(dedup_key(obj)):
+                            total_dupes += 1
+                            continue
+                        out_f.write(json.dumps(obj) + "\n")
+                        total_out += 1
+
+        out_f.flush()
+        os.fsync(out_f.fileno())
+
+    # Output first, then keys: a crash in between re-emits records on
+    # the next run rather than losing them
+    os.replace(tmp_path, out_path)
+    if seen is not None:
+        seen.commit()
+        seen.close()
+    if tmp_dir is not None:
+        tmp_dir.cleanup()
+
+    print(f"\nDone.")
+    print(f"Total observations checked: {total_in}")
+    print(f"Type & Screen-like observations found: {total_out}")
+    print(f"Duplicate Type & Screen observations dropped: {total_dupes}")
+    print(f"Filtered file written to: {OUTPUT_FILE}")
+
+
+if __name__ == "__main__":
+    main()
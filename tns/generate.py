@@ -0,0 +1,334 @@
+import argparse
+import json
+import uuid
+from datetime import timedelta
+
+from tns import config, fhir_time
+from tns.store import TnsStore
+
+# How many patients each generator uses by default
+NUM_TNS_PATIENTS = 5
+NUM_SURGERY_PATIENTS = 10
+
+# Simple pool of blood types to make things look realistic
+ABO_TYPES = ["A", "B", "AB", "O"]
+RH_TYPES = ["POS", "NEG"]
+
+# Define a few synthetic surgery types
+SURGERY_TYPES = [
+    {
+        "code": "80146002",
+        "display": "Coronary artery bypass graft",
+    },
+    {
+        "code": "52734007",
+        "display": "Total hip replacement",
+    },
+    {
+        "code": "180325003",
+        "display": "Laparoscopic cholecystectomy",
+    },
+]
+
+
+# ------------------------------------------
+# HELPERS
+# ------------------------------------------
+
+def load_patient_ids(max_patients, path=config.PATIENT_FILE):
+    patient_ids = []
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                patient = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if patient.get("resourceType") != "Patient":
+                continue
+
+            pid = patient.get("id")
+            if pid:
+                patient_ids.append(pid)
+                if len(patient_ids) >= max_patients:
+                    break
+    return patient_ids
+
+
+def load_latest_tns_per_patient(path=config.TNS_FILE, batch_size=4096):
+    """Return a TnsStore holding the latest T&S time per patient."""
+    tns_times = TnsStore()
+    patient_ids = []
+    effective = []
+
+    def flush():
+        # parse_many keeps positions, so times line up with patient_ids
+        for patient_id, seconds in zip(patient_ids, fhir_time.parse_many(effective)):
+            if seconds != fhir_time.NO_EPOCH:
+                tns_times.update(patient_id, seconds)
+        patient_ids.clear()
+        effective.clear()
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                obs = json.loads(line)
+            except json.JSONDecodeError:
+                continue
+
+            if obs.get("resourceType") != "Observation":
+                continue
+
+            subject = obs.get("subject", {})
+            ref = subject.get("reference")
+            if not ref or not ref.startswith("Patient/"):
+                continue
+
+            patient_ids.append(ref.split("/", 1)[1])
+            effective.append(obs.get("effectiveDateTime"))
+            if len(effective) >= batch_size:
+                flush()
+
+    flush()
+    return tns_times
+
+
+def write_ndjson(records, path):
+    with open(path, "w", encoding="utf-8") as f:
+        for r in records:
+            f.write(json.dumps(r) + "\n")
+
+
+# ------------------------------------------
+# GENERATORS
+# ------------------------------------------
+
+def generate_type_and_screen(patient_ids):
+    """Synthetic ABO, Rh and antibody screen Observations per patient."""
+    print(f"Using {len(patient_ids)} patients for synthetic Type & Screen data.")
+
+    now = fhir_time.utcnow()
+    records = []
+
+    for i, pid in enumerate(patient_ids, start=1):
+        # Use different times for each patient, some in the past few days
+        base_time = now - timedelta(days=i)
+
+        abo = ABO_TYPES[i % len(ABO_TYPES)]
+        rh = RH_TYPES[i % len(RH_TYPES)]
+        ab_screen_positive = (i % 3 == 0)  # every 3rd patient has a positive screen
+
+        # ABO
+        records.append({
+            "resourceType": "Observation",
+            "id": str(uuid.uuid4()),
+            "status": "final",
+            "category": [{
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                    "code": "laboratory",
+                    "display": "Laboratory"
+                }]
+            }],
+            "code": {
+                "coding": [{
+                    "system": "http://loinc.org",
+                    "code": "883-9",
+                    "display": "ABO group [Type] in Blood"
+                }],
+                "text": "ABO group"
+            },
+            "subject": {"reference": f"Patient/{pid}"},
+            "effectiveDateTime": fhir_time.format_fhir(base_time),
+            "valueCodeableConcept": {
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/v2-0201",
+                    "code": abo,
+                    "display": abo
+                }],
+                "text": abo
+            }
+        })
+
+        # Rh
+        records.append({
+            "resourceType": "Observation",
+            "id": str(uuid.uuid4()),
+            "status": "final",
+            "category": [{
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                    "code": "laboratory",
+                    "display": "Laboratory"
+                }]
+            }],
+            "code": {
+                "coding": [{
+                    "system": "http://loinc.org",
+                    "code": "10331-7",
+                    "display": "Rh [Type] in Blood"
+                }],
+                "text": "Rh type"
+            },
+            "subject": {"reference": f"Patient/{pid}"},
+            "effectiveDateTime": fhir_time.format_fhir(base_time),
+            "valueCodeableConcept": {
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/v2-0074",
+                    "code": rh,
+                    "display": rh
+                }],
+                "text": rh
+            }
+        })
+
+        # Antibody Screen
+        ab_screen_text = "POSITIVE" if ab_screen_positive else "NEGATIVE"
+        ab_screen_code = "POS" if ab_screen_positive else "NEG"
+
+        records.append({
+            "resourceType": "Observation",
+            "id": str(uuid.uuid4()),
+            "status": "final",
+            "category": [{
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/observation-category",
+                    "code": "laboratory",
+                    "display": "Laboratory"
+                }]
+            }],
+            "code": {
+                "coding": [{
+                    "system": "http://loinc.org",
+                    "code": "890-4",
+                    "display": "Blood group antibody screen [Presence] in Serum or Plasma"
+                }],
+                "text": "Antibody screen (transfusion)"
+            },
+            "subject": {"reference": f"Patient/{pid}"},
+            "effectiveDateTime": fhir_time.format_fhir(base_time),
+            "valueCodeableConcept": {
+                "coding": [{
+                    "system": "http://terminology.hl7.org/CodeSystem/v2-0078",
+                    "code": ab_screen_code,
+                    "display": ab_screen_text
+                }],
+                "text": ab_screen_text
+            }
+        })
+
+    return records
+
+
+def generate_surgery_requests(patient_ids):
+    """Synthetic surgery ServiceRequests covering the three T&S scenarios."""
+    tns_latest = load_latest_tns_per_patient()
+    print(f"Loaded latest T&S times for {len(tns_latest)} patients.")
+
+    now = fhir_time.utcnow()
+    records = []
+
+    for i, pid in enumerate(patient_ids, start=1):
+        # Rotate through surgery types
+        stype = SURGERY_TYPES[(i - 1) % len(SURGERY_TYPES)]
+
+        # Decide scenario:
+        #  - 1,4,7,...: Good T&S (within 72h)
+        #  - 2,5,8,...: Old T&S (>72h)
+        #  - 3,6,9,...: No T&S on file
+        scenario = i % 3
+
+        base_time = now + timedelta(days=1 + i)  # surgery scheduled in future
+        occurrence_time = base_time
+
+        # Attach T&S scenario notes
+        if scenario == 1:  # good T&S
+            note = f"T&S expected to be valid (within {config.TNS_VALID_HOURS}h)."
+        elif scenario == 2:  # old T&S
+            note = f"T&S may be outdated (> {config.TNS_VALID_HOURS}h before surgery)."
+        else:  # scenario == 0: no T&S
+            note = "No T&S on file for this patient."
+
+        sr = {
+            "resourceType": "ServiceRequest",
+            "id": str(uuid.uuid4()),
+            "status": "active",
+            "intent": "order",
+            "category": [
+                {
+                    "coding": [
+                        {
+                            "system": "http://snomed.info/sct",
+                            "code": "387713003",
+                            "display": "Surgical procedure"
+                        }
+                    ],
+                    "text": "Surgical procedure"
+                }
+            ],
+            "code": {
+                "coding": [
+                    {
+                        "system": "http://snomed.info/sct",
+                        "code": stype["code"],
+                        "display": stype["display"]
+                    }
+                ],
+                "text": stype["display"]
+            },
+            "subject": {
+                "reference": f"Patient/{pid}"
+            },
+            "authoredOn": fhir_time.format_fhir(now),
+            "occurrenceDateTime": fhir_time.format_fhir(occurrence_time),
+            "note": [
+                {
+                    "text": note
+                }
+            ]
+        }
+
+        records.append(sr)
+
+    return records
+
+
+# ------------------------------------------
+# MAIN ENTRY POINT
+# ------------------------------------------
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns generate",
+        description="Generate synthetic FHIR data from MimicPatient.ndjson."
+    )
+    parser.add_argument("kind", choices=["type-and-screen", "surgeries"])
+    parser.add_argument("--patients", type=int, help="Number of patients to use")
+    parser.add_argument("--output", help="NDJSON file to write")
+    args = parser.parse_args(argv)
+
+    if args.kind == "type-and-screen":
+        num_patients = args.patients or NUM_TNS_PATIENTS
+        output = args.output or config.TNS_FILE
+    else:
+        num_patients = args.patients or NUM_SURGERY_PATIENTS
+        output = args.output or config.SURGERY_FILE
+
+    patient_ids = load_patient_ids(max_patients=num_patients)
+    if not patient_ids:
+        print(f"❌ No patients found in {config.PATIENT_FILE}")
+        return
+
+    if args.kind == "type-and-screen":
+        records = generate_type_and_screen(patient_ids)
+        label = "Type & Screen observations"
+    else:
+        records = generate_surgery_requests(patient_ids)
+        label = "surgery ServiceRequests"
+
+    write_ndjson(records, output)
+    print(f"✅ Wrote {len(records)} synthetic {label} to {output}")
@@ -0,0 +1,290 @@
+import argparse
+import json
+import math
+import threading
+import time
+from collections import defaultdict
+
+from tns import config, fhir_time
+from tns.evaluate import build_result, evaluate_surgery, iter_surgery_requests
+from tns.serve import FhirStore, make_server
+
+# ------------------------------------------
+# SCHEDULE REPLAY
+# ------------------------------------------
+# Feeds generated ServiceRequests and T&S Observations into an
+# in-process FHIR stand-in in timestamp order, at N× real time, while
+# the evaluator polls it. Every time an event changes what the correct
+# alert for a surgery is, we time how long it takes the evaluator to
+# report that alert.
+
+DEFAULT_SPEED = 3600        # 1 hour of schedule per second
+DEFAULT_POLL_SECONDS = 0.5  # pause between evaluator cycles
+DEFAULT_SETTLE_SECONDS = 30
+
+
+def event_time(resource):
+    """When a resource appears in the schedule, or None for "at start"."""
+    if resource.get("resourceType") == "Observation":
+        value = resource.get("effectiveDateTime")
+    else:
+        value = resource.get("authoredOn")
+    try:
+        return fhir_time.to_epoch(value) if value else None
+    except ValueError:
+        return None
+
+
+def load_events(paths):
+    """Return [(event_time, resource)] sorted by time, stable per file."""
+    events = []
+    for path in paths:
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    resource = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if resource.get("resourceType") in ("ServiceRequest", "Observation"):
+                    events.append((event_time(resource), resource))
+
+    if not events:
+        return []
+    start = min((t for t, _ in events if t is not None), default=0)
+    events = [(start if t is None else t, r) for t, r in events]
+    events.sort(key=lambda e: e[0])
+    return events
+
+
+def result_key(result):
+    """The parts of an alert that define whether it is the correct one."""
+    return (result["alert"], result["reason"], result.get("latest_tns_time"))
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of an already sorted list."""
+    if not values:
+        return None
+    rank = max(math.ceil(pct / 100 * len(values)), 1)
+    return values[rank - 1]
+
+
+class GroundTruth:
+    """
+    What the evaluator should report for each surgery, given every
+    event applied so far. Uses the evaluator's own alert conditions.
+    """
+
+    def __init__(self):
+        self.tns_times = defaultdict(list)   # patient id -> [aware datetimes]
+        self.surgeries = {}                  # surgery id -> (sr, patient id, surgery time)
+        self.by_patient = defaultdict(set)   # patient id -> surgery ids
+        self.expected = {}                   # surgery id -> result_key
+
+    def apply(self, resource):
+        """Record one event; return [(surgery_id, expected_key)] that changed."""
+        ref = resource.get("subject", {}).get("reference") or ""
+        if not ref.startswith("Patient/"):
+            return []
+        patient_id = ref.split("/")[1]
+
+        if resource["resourceType"] == "Observation":
+            try:
+                self.tns_times[patient_id].append(fhir_time.parse(resource["effectiveDateTime"]))
+            except (KeyError, ValueError):
+                return []
+            affected = self.by_patient[patient_id]
+        else:
+            occurrence = resource.get("occurrenceDateTime")
+            if not occurrence or not resource.get("id"):
+                return []
+            sid = resource["id"]
+            self.surgeries[sid] = (resource, patient_id, fhir_time.parse(occurrence))
+            self.by_patient[patient_id].add(sid)
+            affected = [sid]
+
+        changed = []
+        for sid in sorted(affected):
+            sr, pid, surgery_time = self.surgeries[sid]
+            before = [t for t in self.tns_times[pid] if t <= surgery_time]
+            key = result_key(build_result(sr, pid, surgery_time, max(before, default=None)))
+            if self.expected.get(sid) != key:
+                self.expected[sid] = key
+                changed.append((sid, key))
+        return changed
+
+
+def run_replay(events, speed=DEFAULT_SPEED, poll=DEFAULT_POLL_SECONDS,
+               settle=DEFAULT_SETTLE_SECONDS):
+    """
+    Replay events against a local stand-in while evaluating it in a
+    loop. Returns the list of state changes with detection times.
+    """
+    store = FhirStore()
+    server = make_server(store, port=0)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    # Point the evaluator at the stand-in for this replay only
+    saved_base = config.FHIR_BASE
+    config.FHIR_BASE = f"http://127.0.0.1:{server.server_address[1]}"
+
+    truth = GroundTruth()
+    lock = threading.Lock()
+    changes = []
+    pending = defaultdict(list)   # surgery id -> undetected changes
+    feeder_done = threading.Event()
+
+    schedule_start = events[0][0]
+    wall_start = time.perf_counter()
+
+    def feed():
+        for when, resource in events:
+            delay = wall_start + (when - schedule_start) / speed - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            with lock:
+                store.put(resource)
+                applied = time.perf_counter()
+                for sid, key in truth.apply(resource):
+                    # An undetected earlier change that is now stale
+                    # can never be observed; count it separately
+                    for old in pending.pop(sid, []):
+                        old["superseded"] = True
+                    change = {
+                        "surgery_id": sid,
+                        "expected": key,
+                        "event_time": when,
+                        "surgery_time": truth.surgeries[sid][2].timestamp(),
+                        "applied": applied,
+                        "detected": None,
+                        "superseded": False,
+                    }
+                    changes.append(change)
+                    pending[sid].append(change)
+        feeder_done.set()
+
+    feeder = threading.Thread(target=feed, daemon=True)
+    feeder.start()
+
+    done_at = None
+    try:
+        while True:
+            for sr in iter_surgery_requests(None):
+                started = time.perf_counter()
+                result = evaluate_surgery(None, sr)
+                finished = time.perf_counter()
+                if not result:
+                    continue
+                with lock:
+                    for change in pending.get(result["surgery_id"], []):
+                        if change["applied"] <= started and change["expected"] == result_key(result):
+                            change["detected"] = finished
+                    pending[result["surgery_id"]] = [
+                        c for c in pending.get(result["surgery_id"], []) if c["detected"] is None
+                    ]
+
+            if feeder_done.is_set():
+                done_at = done_at or time.perf_counter()
+                with lock:
+                    outstanding = any(pending.values())
+                if not outstanding or time.perf_counter() - done_at > settle:
+                    break
+            time.sleep(poll)
+    finally:
+        config.FHIR_BASE = saved_base
+        server.shutdown()
+        server.server_close()
+
+    for change in changes:
+        # Where on the schedule the correct alert became visible
+        if change["detected"] is not None:
+            elapsed = change["detected"] - wall_start
+            change["detected_schedule_time"] = schedule_start + elapsed * speed
+    return changes
+
+
+def summarize(changes, speed):
+    detected = [c for c in changes if c["detected"] is not None]
+    superseded = [c for c in changes if c["superseded"]]
+    missed = [c for c in changes if c["detected"] is None and not c["superseded"]]
+
+    latencies = sorted(c["detected"] - c["applied"] for c in detected)
+    leads = sorted(c["surgery_time"] - c["detected_schedule_time"] for c in detected)
+
+    return {
+        "changes": len(changes),
+        "detected": len(detected),
+        "superseded": len(superseded),
+        "missed": len(missed),
+        "speed": speed,
+        "latency_p50": percentile(latencies, 50),
+        "latency_p95": percentile(latencies, 95),
+        "latency_p99": percentile(latencies, 99),
+        "latency_max": latencies[-1] if latencies else None,
+        "min_lead_hours": leads[0] / 3600 if leads else None,
+        "late_alerts": sum(1 for lead in leads if lead < 0),
+    }
+
+
+def print_summary(summary):
+    def seconds(value):
+        return "   n/a" if value is None else f"{value:6.3f}"
+
+    def schedule_hours(value):
+        return "   n/a" if value is None else f"{value * summary['speed'] / 3600:6.2f}"
+
+    print(f"State changes: {summary['changes']} "
+          f"({summary['detected']} detected, {summary['superseded']} superseded, "
+          f"{summary['missed']} missed)")
+    print("Alert latency after state change:")
+    for label in ("p50", "p95", "p99", "max"):
+        value = summary[f"latency_{label}"]
+        print(f"  {label:>3}  {seconds(value)} s wall   {schedule_hours(value)} h at {summary['speed']:g}×")
+    if summary["min_lead_hours"] is not None:
+        print(f"Smallest lead time before incision: {summary['min_lead_hours']:.2f} h "
+              f"({summary['late_alerts']} alerts appeared after incision)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns replay",
+        description="Replay generated surgeries and T&S results at N× real time "
+                    "and measure how quickly the evaluator reports the correct alert."
+    )
+    parser.add_argument("--requests", default=config.SURGERY_FILE, help="ServiceRequest NDJSON")
+    parser.add_argument("--observations", default=config.TNS_FILE, help="T&S Observation NDJSON")
+    parser.add_argument("--speed", type=float, default=DEFAULT_SPEED, help="Replay speed (× real time)")
+    parser.add_argument("--poll", type=float, default=DEFAULT_POLL_SECONDS,
+                        help="Seconds between evaluator cycles")
+    parser.add_argument("--settle", type=float, default=DEFAULT_SETTLE_SECONDS,
+                        help="Seconds to keep evaluating after the last event")
+    parser.add_argument("--max-p99", type=float,
+                        help="Fail (exit 1) if p99 wall latency exceeds this many seconds "
+                             "or any state change is never reported")
+    parser.add_argument("--report", help="Also write the summary as JSON to this file")
+    args = parser.parse_args(argv)
+
+    events = load_events([args.observations, args.requests])
+    if not events:
+        print("❌ No ServiceRequests or Observations to replay.")
+        raise SystemExit(1)
+
+    span_hours = (events[-1][0] - events[0][0]) / 3600
+    print(f"⏩ Replaying {len(events)} events ({span_hours:.1f} h of schedule) "
+          f"at {args.speed:g}× → ~{span_hours * 3600 / args.speed:.1f} s")
+
+    changes = run_replay(events, speed=args.speed, poll=args.poll, settle=args.settle)
+    summary = summarize(changes, args.speed)
+    print_summary(summary)
+
+    if args.report:
+        with open(args.report, "w", encoding="utf-8") as f:
+            json.dump(summary, f, indent=2)
+
+    if args.max_p99 is not None:
+        p99 = summary["latency_p99"]
+        if summary["missed"] or (p99 is not None and p99 > args.max_p99):
+            print(f"❌ Alert freshness gate failed (p99 limit {args.max_p99} s)")
+            raise SystemExit(1)
+        print(f"✅ Alert freshness gate passed (p99 limit {args.max_p99} s)")
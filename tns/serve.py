@@ -0,0 +1,269 @@
+import argparse
+import json
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+
+from tns import fhir_time
+
+# ------------------------------------------
+# LOCAL FHIR STAND-IN
+# ------------------------------------------
+# Just enough of the FHIR REST API for the tns subcommands to run
+# without a real server: create/read/update, batch Bundles, and the
+# searches the evaluator issues (ServiceRequest paging, Observation by
+# subject + code, sorted by date or _id). Everything is held in memory.
+
+DEFAULT_PAGE_SIZE = 50
+
+
+def resource_date(resource):
+    """Epoch seconds used for _sort=date, or None."""
+    for field in ("effectiveDateTime", "occurrenceDateTime", "issued", "authoredOn"):
+        value = resource.get(field)
+        if value:
+            try:
+                return fhir_time.to_epoch(value)
+            except ValueError:
+                return None
+    return None
+
+
+def matches_code(resource, tokens):
+    """FHIR token search: any coding matching any 'system|code' or 'code'."""
+    for coding in resource.get("code", {}).get("coding", []):
+        for token in tokens:
+            system, sep, code = token.rpartition("|")
+            if coding.get("code") == code and (not sep or coding.get("system") == system):
+                return True
+    return False
+
+
+class FhirStore:
+    """Thread-safe in-memory resource store with a subject index."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._resources = {}   # resourceType -> {id: resource}
+        self._by_subject = {}  # (resourceType, reference) -> set of ids
+
+    def put(self, resource):
+        """Create or replace a resource, assigning an id if it has none."""
+        rtype = resource["resourceType"]
+        rid = resource.setdefault("id", str(uuid.uuid4()))
+
+        with self._lock:
+            by_id = self._resources.setdefault(rtype, {})
+            old = by_id.get(rid)
+            if old is not None:
+                old_ref = old.get("subject", {}).get("reference")
+                self._by_subject.get((rtype, old_ref), set()).discard(rid)
+
+            by_id[rid] = resource
+            ref = resource.get("subject", {}).get("reference")
+            if ref:
+                self._by_subject.setdefault((rtype, ref), set()).add(rid)
+        return resource
+
+    def get(self, resource_type, resource_id):
+        with self._lock:
+            return self._resources.get(resource_type, {}).get(resource_id)
+
+    def load_ndjson(self, path):
+        count = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    resource = json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+                if "resourceType" in resource:
+                    self.put(resource)
+                    count += 1
+        return count
+
+    def search(self, resource_type, params):
+        """Return every matching resource, sorted as requested."""
+        subject = params.get("subject") or params.get("patient")
+        if subject and not subject.startswith("Patient/"):
+            subject = f"Patient/{subject}"
+
+        with self._lock:
+            by_id = self._resources.get(resource_type, {})
+            if subject:
+                ids = self._by_subject.get((resource_type, subject), ())
+                candidates = [by_id[i] for i in ids]
+            else:
+                candidates = list(by_id.values())
+
+        code = params.get("code")
+        if code:
+            tokens = code.split(",")
+            candidates = [r for r in candidates if matches_code(r, tokens)]
+
+        sort = params.get("_sort", "")
+        descending = sort.startswith("-")
+        if sort.lstrip("-") == "date":
+            dated = [(resource_date(r), r) for r in candidates]
+            dated.sort(key=lambda pair: pair[0] or 0, reverse=descending)
+            candidates = [r for _, r in dated]
+        elif sort.lstrip("-") == "_id":
+            candidates.sort(key=lambda r: r["id"], reverse=descending)
+        # Without _sort, results come back in whatever order they are
+        # held, like a real server that promises none
+
+        return candidates
+
+
+def process_bundle(store, bundle):
+    """Apply a batch/transaction Bundle of POST and PUT entries."""
+    responses = []
+    for entry in bundle.get("entry", []):
+        request = entry.get("request", {})
+        resource = entry.get("resource") or {}
+        parts = [p for p in request.get("url", "").split("?")[0].split("/") if p]
+        method = request.get("method")
+
+        if method == "PUT" and len(parts) == 2:
+            resource["resourceType"], resource["id"] = parts
+            store.put(resource)
+            status = "200 OK"
+        elif method == "POST" and len(parts) == 1:
+            resource["resourceType"] = parts[0]
+            resource.pop("id", None)
+            store.put(resource)
+            status = "201 Created"
+        else:
+            responses.append({"response": {"status": "400 Bad Request"}})
+            continue
+
+        responses.append({
+            "response": {"status": status, "location": f"{parts[0]}/{resource['id']}"}
+        })
+
+    response_type = "transaction-response" if bundle.get("type") == "transaction" else "batch-response"
+    return {"resourceType": "Bundle", "type": response_type, "entry": responses}
+
+
+# ------------------------------------------
+# HTTP LAYER
+# ------------------------------------------
+
+def make_handler(store):
+    class FhirHandler(BaseHTTPRequestHandler):
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status, body=None, headers=None):
+            data = b"" if body is None else json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/fhir+json")
+            self.send_header("Content-Length", str(len(data)))
+            for key, value in (headers or {}).items():
+                self.send_header(key, value)
+            self.end_headers()
+            self.wfile.write(data)
+
+        def _read_body(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            return json.loads(self.rfile.read(length) or b"{}")
+
+        def _base_url(self):
+            host = self.headers.get("Host") or "%s:%s" % self.server.server_address[:2]
+            return f"http://{host}"
+
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split("/") if p]
+            params = {k: v[-1] for k, v in parse_qs(url.query).items()}
+
+            if parts == ["metadata"]:
+                return self._send(200, {"resourceType": "CapabilityStatement", "status": "active"})
+
+            if len(parts) == 2:
+                resource = store.get(*parts)
+                if resource is None:
+                    return self._send(404, {"resourceType": "OperationOutcome"})
+                return self._send(200, resource)
+
+            if len(parts) != 1:
+                return self._send(404, {"resourceType": "OperationOutcome"})
+
+            matches = store.search(parts[0], params)
+            count = int(params.get("_count", DEFAULT_PAGE_SIZE))
+            offset = int(params.get("_offset", 0))
+            page = matches[offset:offset + count]
+
+            bundle = {
+                "resourceType": "Bundle",
+                "type": "searchset",
+                "total": len(matches),
+                "entry": [{"resource": r} for r in page],
+                "link": [],
+            }
+            if offset + count < len(matches):
+                next_params = dict(params, _offset=offset + count)
+                bundle["link"].append({
+                    "relation": "next",
+                    "url": f"{self._base_url()}/{parts[0]}?{urlencode(next_params)}",
+                })
+            return self._send(200, bundle)
+
+        def do_POST(self):
+            parts = [p for p in urlsplit(self.path).path.split("/") if p]
+            if not parts:
+                return self._send(200, process_bundle(store, self._read_body()))
+            if len(parts) != 1:
+                return self._send(404, {"resourceType": "OperationOutcome"})
+
+            resource = self._read_body()
+            resource["resourceType"] = parts[0]
+            resource.pop("id", None)
+            store.put(resource)
+            return self._send(201, resource, {"Location": f"{parts[0]}/{resource['id']}"})
+
+        def do_PUT(self):
+            parts = [p for p in urlsplit(self.path).path.split("/") if p]
+            if len(parts) != 2:
+                return self._send(404, {"resourceType": "OperationOutcome"})
+
+            resource = self._read_body()
+            resource["resourceType"], resource["id"] = parts
+            store.put(resource)
+            return self._send(200, resource)
+
+    return FhirHandler
+
+
+def make_server(store, host="127.0.0.1", port=8080):
+    """Build (but don't start) an HTTP server in front of store."""
+    return ThreadingHTTPServer((host, port), make_handler(store))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns serve",
+        description="Run an in-memory FHIR stand-in for local testing."
+    )
+    parser.add_argument("files", nargs="*", help="NDJSON files to preload")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    args = parser.parse_args(argv)
+
+    store = FhirStore()
+    for path in args.files:
+        print(f"Loaded {store.load_ndjson(path)} resources from {path}")
+
+    server = make_server(store, args.host, args.port)
+    base = f"http://{args.host}:{server.server_address[1]}"
+    print(f"🩸 Local FHIR stand-in at {base}")
+    print(f"   Point other commands at it with TNS_FHIR_BASE={base} TNS_AUTH=none")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,106 @@
+from array import array
+
+from tns.fhir_time import from_epoch
+
+# Sentinel stored in the epoch column for "patient known, no T&S on file"
+NO_TNS = -(2 ** 63)
+
+
+class TnsStore:
+    """
+    Compact "latest Type & Screen per patient" store.
+
+    Patient ids are packed once into a single bytearray and mapped to
+    integer rows through an open-addressing hash table held in
+    array('q'). Latest T&S times live in a parallel array('q') of epoch
+    seconds. No per-patient Python objects are kept, so a patient costs
+    its id bytes plus a few 8-byte slots.
+    """
+
+    def __init__(self, capacity=1024):
+        size = 8
+        while size < capacity * 2:
+            size *= 2
+        self._id_bytes = bytearray()      # all patient ids, back to back
+        self._id_offsets = array("q", [0])  # row -> start offset in _id_bytes
+        self._slots = array("q", [0]) * size  # hash table: row + 1, 0 = empty
+        self._latest = array("q")         # row -> latest T&S epoch seconds
+
+    def __len__(self):
+        return len(self._latest)
+
+    def __contains__(self, patient_id):
+        return self._find(patient_id.encode())[1] >= 0
+
+    def _id_at(self, row):
+        return bytes(self._id_bytes[self._id_offsets[row]:self._id_offsets[row + 1]])
+
+    def _find(self, key):
+        """Return (slot, row) for key; row is -1 if key is absent."""
+        mask = len(self._slots) - 1
+        slot = hash(key) & mask
+        while True:
+            entry = self._slots[slot]
+            if entry == 0:
+                return slot, -1
+            if self._id_at(entry - 1) == key:
+                return slot, entry - 1
+            slot = (slot + 1) & mask
+
+    def _grow(self):
+        size = len(self._slots) * 2
+        mask = size - 1
+        self._slots = array("q", [0]) * size
+        for row in range(len(self._latest)):
+            slot = hash(self._id_at(row)) & mask
+            while self._slots[slot]:
+                slot = (slot + 1) & mask
+            self._slots[slot] = row + 1
+
+    def row(self, patient_id):
+        """Return the row for patient_id, adding the patient if new."""
+        key = patient_id.encode()
+        slot, row = self._find(key)
+        if row >= 0:
+            return row
+
+        row = len(self._latest)
+        self._id_bytes += key
+        self._id_offsets.append(len(self._id_bytes))
+        self._latest.append(NO_TNS)
+        self._slots[slot] = row + 1
+
+        if (row + 1) * 2 > len(self._slots):
+            self._grow()
+        return row
+
+    def update(self, patient_id, epoch_seconds):
+        """Record a T&S time, keeping only the latest one per patient."""
+        row = self.row(patient_id)
+        if epoch_seconds > self._latest[row]:
+            self._latest[row] = epoch_seconds
+
+    def latest_epoch(self, patient_id):
+        """Latest T&S time as epoch seconds, or None."""
+        row = self._find(patient_id.encode())[1]
+        if row < 0 or self._latest[row] == NO_TNS:
+            return None
+        return self._latest[row]
+
+    def latest(self, patient_id):
+        """Latest T&S time as an aware UTC datetime, or None."""
+        seconds = self.latest_epoch(patient_id)
+        return None if seconds is None else from_epoch(seconds)
+
+    def patient_ids(self):
+        for row in range(len(self._latest)):
+            yield self._id_at(row).decode()
+
+    def nbytes(self):
+        """Bytes held by the store's arrays."""
+        return (
+            len(self._id_bytes)
+            + self._id_offsets.itemsize * len(self._id_offsets)
+            + self._slots.itemsize * len(self._slots)
+            + self._latest.itemsize * len(self._latest)
+        )
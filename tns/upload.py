@@ -0,0 +1,76 @@
+import argparse
+import json
+from pathlib import Path
+
+from tns import config
+from tns.fhir import auth_headers, get_access_token, session
+
+# What each upload kind posts, the file it reads by default, and
+# whether it stops at the first failed POST, as the surgery uploader
+# always has
+UPLOAD_KINDS = {
+    "type-and-screen": ("Observation", config.TNS_FILE, False),
+    "surgeries": ("ServiceRequest", config.SURGERY_FILE, True),
+}
+
+
+def upload_ndjson(token, path, resource_type, stop_on_failure=False):
+    """
+    POST every resource in an NDJSON file; return (uploaded, failed).
+    With stop_on_failure, give up at the first failed POST.
+    """
+    resource_url = f"{config.FHIR_BASE}/{resource_type}"
+    headers = auth_headers(token, content_type="application/fhir+json")
+
+    uploaded = 0
+    failed = 0
+
+    with open(path, "r", encoding="utf-8") as f:
+        for line_number, line in enumerate(f, start=1):
+            line = line.strip()
+            if not line:
+                continue
+
+            try:
+                resource = json.loads(line)
+            except json.JSONDecodeError as e:
+                print(f"⚠️ Line {line_number}: Invalid JSON - {e}")
+                continue
+
+            response = session().post(resource_url, headers=headers, json=resource)
+
+            if response.status_code in (200, 201):
+                print(f"✅ Line {line_number}: Uploaded")
+                uploaded += 1
+            else:
+                print(f"❌ Line {line_number}: Failed ({response.status_code})")
+                print(response.text)
+                failed += 1
+                if stop_on_failure:
+                    break
+
+    return uploaded, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog="tns upload",
+        description="POST synthetic NDJSON resources to the FHIR server."
+    )
+    parser.add_argument("kind", choices=sorted(UPLOAD_KINDS))
+    parser.add_argument("--file", help="NDJSON file to upload")
+    args = parser.parse_args(argv)
+
+    resource_type, default_file, stop_on_failure = UPLOAD_KINDS[args.kind]
+    path = Path(args.file or default_file)
+    if not path.exists():
+        print(f"❌ NDJSON file not found: {path.resolve()}")
+        raise SystemExit(1)
+
+    token = get_access_token()
+
+    print(f"Uploading records from {path} to {resource_type} endpoint...\n")
+    uploaded, failed = upload_ndjson(token, path, resource_type, stop_on_failure)
+    print(f"\nUploaded {uploaded}, failed {failed}.")
+    if failed:
+        raise SystemExit(1)